@@ -0,0 +1,59 @@
+"""Compares block_to_block_type with the is_* chain on a block-heavy corpus.
+
+Usage: python benchmarks/bench_block_types.py [--pages N] [--blocks N] [--repeat N]
+"""
+
+import argparse
+import timeit
+
+from corpus import CorpusGenerator
+
+from static_site_gen.markdownparser import (
+    block_to_block_type,
+    block_to_block_type_chain,
+    markdown_to_blocks,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=200, help="blocks per page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Mostly lists and quotes, the block types the chain scans line by line
+    generator = CorpusGenerator(
+        pages=args.pages,
+        blocks=args.blocks,
+        block_mix={
+            "paragraph": 2,
+            "heading": 1,
+            "code": 1,
+            "quote": 3,
+            "ul": 3,
+            "ol": 3,
+        },
+    )
+    blocks = [
+        block
+        for _ in range(args.pages)
+        for block in markdown_to_blocks(generator.page())
+    ]
+    for block in blocks:
+        assert block_to_block_type(block) == block_to_block_type_chain(block)
+
+    print(f"{len(blocks)} blocks")
+    for name, classify in (
+        ("is_* chain", block_to_block_type_chain),
+        ("block_to_block_type", block_to_block_type),
+    ):
+        timer = timeit.Timer(lambda: [classify(block) for block in blocks])
+        best = min(timer.repeat(repeat=args.repeat, number=1))
+        print(
+            f"{name:<22}{best * 1000:>10.2f}ms {best * 1e9 / len(blocks):>10.0f}ns/block"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Reports peak RSS while every page's parsed tree is held in memory.
+
+Usage: python benchmarks/bench_memory.py [content_dir] [--copies N] [--inline-cache-size N]
+
+The inline fragment memo is off by default: with it, every copy after the first
+shares the fragments of the first one, and the trees look far smaller than a
+build's.
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+from static_site_gen.markdownparser import markdown_to_html_node, set_inline_cache_size
+
+
+def peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    if sys.platform == "darwin":
+        return peak // 1024
+    return peak
+
+
+def count_nodes(node) -> int:
+    if node.children is None:
+        return 1
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def read_pages(content_dir: str) -> list:
+    pages = []
+    for dirpath, _, filenames in os.walk(content_dir):
+        for filename in sorted(filenames):
+            if filename.endswith(".md"):
+                with open(os.path.join(dirpath, filename), "r") as page_file:
+                    pages.append(page_file.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("content_dir", nargs="?", default="./content")
+    parser.add_argument(
+        "--copies", type=int, default=1000, help="times to parse every page"
+    )
+    parser.add_argument(
+        "--inline-cache-size",
+        type=int,
+        default=0,
+        help="inline fragments to memoize while parsing, 0 disables the memo",
+    )
+    args = parser.parse_args()
+    set_inline_cache_size(args.inline_cache_size)
+
+    pages = read_pages(args.content_dir)
+    baseline = peak_rss_kib()
+    start = time.perf_counter()
+    trees = [markdown_to_html_node(page) for _ in range(args.copies) for page in pages]
+    elapsed = time.perf_counter() - start
+    nodes = sum(count_nodes(tree) for tree in trees)
+    peak = peak_rss_kib()
+
+    print(f"trees held:     {len(trees)}")
+    print(f"nodes held:     {nodes}")
+    print(f"parse time:     {elapsed:.3f}s")
+    print(f"peak rss:       {peak / 1024:.1f} MiB")
+    print(f"rss for trees:  {(peak - baseline) / 1024:.1f} MiB")
+    print(f"bytes per node: {(peak - baseline) * 1024 / max(nodes, 1):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Generates a synthetic markdown site for benchmarking.
+
+Usage: python benchmarks/corpus.py DEST [--pages N] [--blocks N] [--block-mix ...]
+"""
+
+import argparse
+import os
+import random
+
+WORDS = (
+    "hobbit ring shire wizard elf dwarf mountain river forest tower road "
+    "king steward horse sword song map lantern bridge harbour valley"
+).split()
+
+BLOCK_TYPES = ("paragraph", "heading", "code", "quote", "ul", "ol")
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 5,
+    "heading": 2,
+    "code": 1,
+    "quote": 1,
+    "ul": 2,
+    "ol": 1,
+}
+
+
+def parse_block_mix(text: str) -> dict:
+    """Parses a block mix like "paragraph=5,heading=2,code=1" into weights."""
+    block_mix = {}
+    for item in text.split(","):
+        block_type, _, weight = item.partition("=")
+        if block_type not in BLOCK_TYPES:
+            raise ValueError(f"Unknown block type {block_type}.")
+        block_mix[block_type] = int(weight)
+    return block_mix
+
+
+class CorpusGenerator:
+    """Writes random but reproducible markdown pages from a set of parameters."""
+
+    def __init__(
+        self,
+        pages: int = 100,
+        blocks: int = 20,
+        block_mix: dict = None,
+        inline_density: float = 0.1,
+        links: int = 3,
+        nesting_depth: int = 2,
+        seed: int = 0,
+    ):
+        self.pages = pages
+        self.blocks = blocks
+        self.block_mix = block_mix or DEFAULT_BLOCK_MIX
+        self.inline_density = inline_density
+        self.links = links
+        self.nesting_depth = nesting_depth
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def params(self) -> dict:
+        return {
+            "pages": self.pages,
+            "blocks": self.blocks,
+            "block_mix": self.block_mix,
+            "inline_density": self.inline_density,
+            "links": self.links,
+            "nesting_depth": self.nesting_depth,
+            "seed": self.seed,
+        }
+
+    def words(self, count: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def inline_text(self, count: int) -> str:
+        """Words with inline_density of them formatted as bold, italic or code."""
+        parts = []
+        for _ in range(count):
+            word = self.random.choice(WORDS)
+            if self.random.random() < self.inline_density:
+                delimiter = self.random.choice(("**", "_", "`"))
+                word = f"{delimiter}{word}{delimiter}"
+            parts.append(word)
+        return " ".join(parts)
+
+    def link(self) -> str:
+        if self.random.random() < 0.2:
+            return f"![{self.words(2)}](/images/{self.random.choice(WORDS)}.png)"
+        return f"[{self.words(2)}](/{self.random.choice(WORDS)})"
+
+    def paragraph(self) -> str:
+        text = self.inline_text(self.random.randint(20, 60))
+        words = text.split(" ")
+        for _ in range(self.links):
+            words.insert(self.random.randint(0, len(words)), self.link())
+        return " ".join(words)
+
+    def block(self, block_type: str) -> str:
+        match block_type:
+            case "heading":
+                return f"{'#' * self.random.randint(2, 4)} {self.words(4)}"
+            case "code":
+                return f"```\n{self.words(6)}\n{self.words(6)}\n```"
+            case "quote":
+                lines = [self.inline_text(10) for _ in range(self.random.randint(1, 4))]
+                return "\n".join(f"> {line}" for line in lines)
+            case "ul":
+                items = [self.inline_text(6) for _ in range(self.random.randint(2, 8))]
+                return "\n".join(f"- {item}" for item in items)
+            case "ol":
+                items = [self.inline_text(6) for _ in range(self.random.randint(2, 8))]
+                return "\n".join(f"{idx + 1}. {item}" for idx, item in enumerate(items))
+        return self.paragraph()
+
+    def page(self) -> str:
+        block_types = list(self.block_mix)
+        weights = [self.block_mix[block_type] for block_type in block_types]
+        blocks = [f"# {self.words(5)}"]
+        for block_type in self.random.choices(block_types, weights, k=self.blocks):
+            blocks.append(self.block(block_type))
+        return "\n\n".join(blocks) + "\n"
+
+    def page_path(self, index: int) -> str:
+        """Spreads pages over directories up to nesting_depth levels deep."""
+        depth = index % (self.nesting_depth + 1)
+        parts = [f"section{(index // (idx + 1)) % 10}" for idx in range(depth)]
+        return os.path.join(*parts, f"page{index}", "index.md")
+
+    def write(self, dest_dir: str):
+        for index in range(self.pages):
+            page_path = os.path.join(dest_dir, self.page_path(index))
+            os.makedirs(os.path.dirname(page_path), exist_ok=True)
+            with open(page_path, "w") as page_file:
+                page_file.write(self.page())
+
+
+def add_corpus_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument(
+        "--block-mix",
+        type=parse_block_mix,
+        default=None,
+        help="block weights, e.g. paragraph=5,heading=2,code=1,quote=1,ul=2,ol=1",
+    )
+    parser.add_argument(
+        "--inline-density",
+        type=float,
+        default=0.1,
+        help="share of words that are bold, italic or code",
+    )
+    parser.add_argument("--links", type=int, default=3, help="links per paragraph")
+    parser.add_argument("--nesting-depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generator_from_args(args: argparse.Namespace) -> CorpusGenerator:
+    return CorpusGenerator(
+        pages=args.pages,
+        blocks=args.blocks,
+        block_mix=args.block_mix,
+        inline_density=args.inline_density,
+        links=args.links,
+        nesting_depth=args.nesting_depth,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dest_dir")
+    add_corpus_args(parser)
+    args = parser.parse_args()
+    generator_from_args(args).write(args.dest_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Times each stage of the build on a synthetic corpus and saves the results as json.
+
+Usage: python benchmarks/run.py [--output results.json] [--compare baseline.json]
+
+Stages run with the inline fragment memo off, since repeating a stage would
+otherwise time a memo the first run already filled. The "+memo" stages start
+every run with an empty memo, the way a build from the command line does.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+from corpus import add_corpus_args, generator_from_args
+
+from static_site_gen.file_handler import generate_pages_recursive
+from static_site_gen.markdownparser import (
+    INLINE_CACHE_SIZE,
+    MarkdownBlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    set_inline_cache_size,
+    text_to_textnodes,
+)
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+def time_stage(function, repeat: int, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def memo_off():
+    set_inline_cache_size(0)
+
+
+def memo_cold():
+    set_inline_cache_size(INLINE_CACHE_SIZE)
+
+
+def run_benchmarks(content_dir: str, work_dir: str, repeat: int) -> dict:
+    memo_off()
+    pages = []
+    for dirpath, _, filenames in os.walk(content_dir):
+        for filename in sorted(filenames):
+            with open(os.path.join(dirpath, filename), "r") as page_file:
+                pages.append(page_file.read())
+    inline_texts = [
+        block
+        for page in pages
+        for block in markdown_to_blocks(page)
+        if block_to_block_type(block) == MarkdownBlockType.PARAGRAPH
+    ]
+    trees = [markdown_to_html_node(page) for page in pages]
+    template_path = os.path.join(work_dir, "template.html")
+    with open(template_path, "w") as template_file:
+        template_file.write(TEMPLATE)
+
+    def generate_site():
+        generate_pages_recursive(
+            content_dir, template_path, os.path.join(work_dir, "docs"), "/"
+        )
+
+    def parse_pages():
+        return [markdown_to_html_node(page) for page in pages]
+
+    # name -> (stage, setup before every run)
+    stages = {
+        "text_to_textnodes": (
+            lambda: [text_to_textnodes(t) for t in inline_texts],
+            memo_off,
+        ),
+        "markdown_to_html_node": (parse_pages, memo_off),
+        "markdown_to_html_node+memo": (parse_pages, memo_cold),
+        "to_html": (lambda: [tree.to_html() for tree in trees], memo_off),
+        "generate_pages_recursive": (generate_site, memo_off),
+        "generate_pages_recursive+memo": (generate_site, memo_cold),
+    }
+    results = {
+        name: time_stage(stage, repeat, setup)
+        for name, (stage, setup) in stages.items()
+    }
+    memo_cold()
+    return results
+
+
+def print_results(stages: dict, baseline: dict = None):
+    print(f"{'stage':<32}{'min (s)':>12}{'median (s)':>12}{'vs baseline':>14}")
+    for name, timing in stages.items():
+        line = f"{name:<32}{timing['min']:>12.4f}{timing['median']:>12.4f}"
+        if baseline is not None and name in baseline["stages"]:
+            ratio = timing["min"] / baseline["stages"][name]["min"]
+            line += f"{ratio:>13.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_corpus_args(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--compare", help="results json of an earlier run")
+    args = parser.parse_args()
+
+    generator = generator_from_args(args)
+    with tempfile.TemporaryDirectory() as work_dir:
+        content_dir = os.path.join(work_dir, "content")
+        generator.write(content_dir)
+        stages = run_benchmarks(content_dir, work_dir, args.repeat)
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": generator.params(),
+        "repeat": args.repeat,
+        "stages": stages,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("corpus") != results["corpus"]:
+            print("warning: baseline was measured on a different corpus")
+    print_results(stages, baseline)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
 #!/usr/bin/env bash
 
-python3 src/static_site_gen/main.py
-cd public && python3 -m http.server 8888
+python3 -m static_site_gen.serve
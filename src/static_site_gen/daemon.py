@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from static_site_gen import scanner, template
+from static_site_gen.frontmatter import MetadataCache
+from static_site_gen.main import log_level, parse_args, run
+from static_site_gen.markdownparser import inline_cache_info
+from static_site_gen.render_cache import DEFAULT_CACHE_SIZE, MemoryRenderCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "./.ssg-daemon.sock"
+
+
+class BuildDaemon:
+    """Runs builds in one long-lived process, so the state of the last build stays warm.
+
+    Compiled templates, directory listings, page metadata, inline fragments and
+    rendered pages are kept in memory between builds. Each cache checks mtimes
+    or content hashes, so a warm build renders the same output as a cold one.
+    """
+
+    def __init__(self, memory_cache_size: int = DEFAULT_CACHE_SIZE):
+        template.set_template_cache(True)
+        scanner.set_listing_cache(True)
+        self.cwd = os.getcwd()
+        self.render_cache = MemoryRenderCache(memory_cache_size)
+        # metadata cache path -> MetadataCache
+        self.metadata_caches = {}
+        self.builds = 0
+        # Builds share the caches and the working directory, so run one at a time
+        self.lock = threading.Lock()
+
+    def handle(self, request: dict) -> dict:
+        if request.get("cwd", self.cwd) != self.cwd:
+            return {
+                "ok": False,
+                "exit_code": 1,
+                "output": f"The daemon serves {self.cwd}, not {request['cwd']}.\n",
+            }
+        command = request.get("command")
+        if command == "build":
+            with self.lock:
+                return self.build(request.get("argv", []))
+        if command == "status":
+            return {"ok": True, "exit_code": 0, "status": self.status()}
+        return {"ok": False, "exit_code": 1, "output": f"Unknown command {command}.\n"}
+
+    def build(self, argv: list) -> dict:
+        """Runs the generator with command line arguments, capturing its output."""
+        started = time.perf_counter()
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(output):
+                args = parse_args(argv)
+        except SystemExit as err:
+            return {"ok": False, "exit_code": err.code, "output": output.getvalue()}
+
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        root_logger.addHandler(handler)
+        root_logger.setLevel(log_level(args))
+        # The in-memory cache can't be shared with pool workers
+        cache = self.render_cache if args.jobs == 1 else None
+        metadata_cache = None
+        if args.listing:
+            metadata_cache = self.metadata_caches.get(args.metadata_cache)
+            if metadata_cache is None:
+                metadata_cache = MetadataCache(args.metadata_cache)
+                self.metadata_caches[args.metadata_cache] = metadata_cache
+        try:
+            with contextlib.redirect_stdout(output):
+                exit_code = run(args, cache, metadata_cache)
+        except Exception as err:
+            output.write(f"{type(err).__name__}: {err}\n")
+            exit_code = 1
+        finally:
+            root_logger.removeHandler(handler)
+            root_logger.setLevel(previous_level)
+        self.builds += 1
+        elapsed = time.perf_counter() - started
+        logger.info("build %d finished in %.1fms", self.builds, elapsed * 1000)
+        return {
+            "ok": exit_code == 0,
+            "exit_code": exit_code,
+            "output": output.getvalue(),
+            "elapsed": elapsed,
+        }
+
+    def status(self) -> dict:
+        inline = inline_cache_info()
+        return {
+            "cwd": self.cwd,
+            "pid": os.getpid(),
+            "builds": self.builds,
+            "inline cache": {"hits": inline.hits, "misses": inline.misses},
+            "render cache entries": len(self.render_cache.entries),
+            "metadata cache entries": sum(
+                len(cache.entries) for cache in self.metadata_caches.values()
+            ),
+        }
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one json request line and answers with one json response line."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            response = {"ok": False, "exit_code": 1, "output": "Invalid request.\n"}
+        else:
+            if request.get("command") == "stop":
+                response = {"ok": True, "exit_code": 0, "output": "stopping\n"}
+                # shutdown() waits for serve_forever(), which is running this handler
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                response = self.server.build_daemon.handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class BuildServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, build_daemon: BuildDaemon):
+        self.build_daemon = build_daemon
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, BuildRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def remove_stale_socket(socket_path: str):
+    """Removes a socket left behind by a daemon that died, refusing to replace a live one."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        send_request(socket_path, {"command": "status"})
+    except OSError:
+        os.remove(socket_path)
+        return
+    raise RuntimeError(f"A build daemon is already listening on {socket_path}.")
+
+
+def send_request(socket_path: str, request: dict) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as response_file:
+            return json.loads(response_file.readline())
+
+
+def parse_daemon_args(argv: list) -> tuple:
+    parser = argparse.ArgumentParser(
+        description="Keep a warm build process around and send it builds.",
+        epilog="Arguments after 'build' are the arguments of static_site_gen.main.",
+    )
+    parser.add_argument("command", choices=("start", "build", "status", "stop"))
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    parser.add_argument(
+        "--memory-cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="MiB of rendered pages the daemon keeps in memory",
+    )
+    args, build_argv = parser.parse_known_args(argv)
+    if build_argv and args.command != "build":
+        parser.error(f"unrecognized arguments: {' '.join(build_argv)}")
+    return args, build_argv
+
+
+def main():
+    args, build_argv = parse_daemon_args(sys.argv[1:])
+    if args.command == "start":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        build_daemon = BuildDaemon(args.memory_cache_size * 1024 * 1024)
+        with BuildServer(args.socket, build_daemon) as server:
+            logger.info("build daemon listening on %s", args.socket)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return
+    request = {"command": args.command, "cwd": os.getcwd(), "argv": build_argv}
+    try:
+        response = send_request(args.socket, request)
+    except OSError as err:
+        print(f"no build daemon on {args.socket}: {err}", file=sys.stderr)
+        sys.exit(1)
+    if "status" in response:
+        print(json.dumps(response["status"], indent=2))
+    sys.stdout.write(response.get("output", ""))
+    sys.exit(response["exit_code"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+
+from static_site_gen.manifest import hash_file
+from static_site_gen.markdownparser import (
+    extract_markdown_images,
+    extract_markdown_links,
+)
+from static_site_gen.textnode import image_table_digest
+
+
+def find_static_refs(markdown: str, static_dir_path: str) -> list:
+    """Returns the static files a page's root-relative links and images point at."""
+    if static_dir_path is None:
+        return []
+    refs = []
+    urls = extract_markdown_images(markdown) + extract_markdown_links(markdown)
+    for _, url in urls:
+        if not url.startswith("/") or url.startswith("//"):
+            continue
+        url = url.split("#", 1)[0].split("?", 1)[0]
+        static_path = os.path.normpath(os.path.join(static_dir_path, url.lstrip("/")))
+        if static_path not in refs and os.path.isfile(static_path):
+            refs.append(static_path)
+    return sorted(refs)
+
+
+def static_url(static_path: str, static_dir_path: str) -> str:
+    """Returns the root-relative url a static file is published at."""
+    return "/" + os.path.relpath(static_path, static_dir_path).replace(os.sep, "/")
+
+
+class DependencyGraph:
+    """Records the inputs of every output page, so a change rebuilds exactly its dependents.
+
+    The entries live in the incremental build manifest. Each one names the page's
+    markdown source, its template and partials and the static files it references,
+    with the hash each input had when the page was last rendered, and keeps the
+    reasons for that render.
+    """
+
+    def __init__(self, outputs: dict = None):
+        # output path -> {"source", "basepath", "template", "static", "inputs", "reasons"}
+        self.outputs = outputs if outputs is not None else {}
+        self.hashes = {}
+
+    def hash_input(self, path: str) -> str:
+        """Hashes each input once per build, however many pages share it."""
+        if path not in self.hashes:
+            try:
+                self.hashes[path] = hash_file(path)
+            except FileNotFoundError:
+                self.hashes[path] = None
+        return self.hashes[path]
+
+    def page_entry(
+        self,
+        from_path: str,
+        basepath: str,
+        template_dependencies: list,
+        static_dir_path: str = None,
+        old_entry: dict = None,
+    ) -> dict:
+        """Builds an output's entry, re-reading the source only when it changed."""
+        source = os.path.normpath(from_path)
+        source_hash = self.hash_input(source)
+        old_inputs = old_entry.get("inputs", {}) if old_entry is not None else {}
+        if source in old_inputs and old_inputs[source] == source_hash:
+            static_refs = old_entry["static"]
+        else:
+            with open(source, "r") as source_file:
+                static_refs = find_static_refs(source_file.read(), static_dir_path)
+        inputs = {source: source_hash}
+        for path in template_dependencies + static_refs:
+            inputs[path] = self.hash_input(path)
+        entry = {
+            "source": source,
+            "basepath": basepath,
+            "template": list(template_dependencies),
+            "static": static_refs,
+            "inputs": inputs,
+        }
+        # img tags describe the processed images, see set_image_table()
+        if static_dir_path is not None:
+            images = image_table_digest(
+                static_url(path, static_dir_path) for path in static_refs
+            )
+            if images:
+                entry["images"] = images
+        return entry
+
+    def dependents(self, paths: set) -> set:
+        """Returns the outputs that have any of the given paths as an input."""
+        paths = {os.path.normpath(path) for path in paths}
+        return {
+            dest_path
+            for dest_path, entry in self.outputs.items()
+            if "inputs" in entry and paths & entry["inputs"].keys()
+        }
+
+    def explain(self, dest_path: str) -> list:
+        """Returns why an output was last rendered, or None if the graph doesn't know it."""
+        entry = self.outputs.get(os.path.normpath(dest_path))
+        if entry is None or "inputs" not in entry:
+            return None
+        return entry.get("reasons", [])
+
+
+def rebuild_reasons(old_entry: dict, new_entry: dict, output_exists: bool) -> list:
+    """Compares an output's recorded inputs with its current ones; empty means up to date."""
+    if old_entry is None or "inputs" not in old_entry:
+        return ["new page"]
+    if not output_exists:
+        return ["output is missing"]
+    reasons = []
+    if old_entry["basepath"] != new_entry["basepath"]:
+        reasons.append(f"basepath changed to {new_entry['basepath']}")
+    if old_entry.get("images") != new_entry.get("images"):
+        reasons.append("processed images changed")
+    old_inputs = old_entry["inputs"]
+    for path, input_hash in new_entry["inputs"].items():
+        if path not in old_inputs:
+            reasons.append(f"{path} is a new input")
+        elif old_inputs[path] != input_hash:
+            reasons.append(f"{path} changed")
+    for path in sorted(old_inputs.keys() - new_entry["inputs"].keys()):
+        reasons.append(f"{path} is no longer an input")
+    return reasons
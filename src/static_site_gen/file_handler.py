@@ -1,57 +1,729 @@
+import asyncio
+import io
+import logging
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from static_site_gen.markdownparser import markdown_to_html_node
-from static_site_gen.markdownparser import extract_title
+from static_site_gen.dependencies import DependencyGraph, rebuild_reasons
+from static_site_gen.frontmatter import MetadataCache, split_front_matter
+from static_site_gen.listing import generate_listings, page_url
+from static_site_gen.markdownparser import (
+    extract_title_from_lines,
+    inline_cache_info,
+    iter_markdown_html,
+    parse_markdown,
+    set_image_table,
+    set_inline_cache_size,
+)
+from static_site_gen.manifest import hash_file, load_manifest, save_manifest
+from static_site_gen.profiling import Profiler, maybe_stage
+from static_site_gen.publish import write_if_changed
+from static_site_gen.render_cache import RenderCache
+from static_site_gen.scanner import (
+    DEFAULT_EXCLUDE,
+    PAGE_INCLUDE,
+    SiteScan,
+    scan_site,
+)
+from static_site_gen.site_artifacts import SiteArtifacts, page_summary, search_terms
+from static_site_gen.template import Template, load_template
+from static_site_gen.textnode import image_table
+
+logger = logging.getLogger(__name__)
 
 
 def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+    os.makedirs(dest_dir_path, exist_ok=True)
+    for from_path, dest_path in scan_site(None, source_dir_path, dest_dir_path).assets:
+        logger.debug(" * %s -> %s", from_path, dest_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.copy(from_path, dest_path)
+
+
+def is_file_unchanged(
+    from_path: str,
+    dest_path: str,
+    checksum: bool = False,
+    from_stat: os.stat_result = None,
+) -> bool:
+    """Compares a static file with its published copy by size and mtime, or by hash."""
+    try:
+        if from_stat is None:
+            from_stat = os.stat(from_path)
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if from_stat.st_size != dest_stat.st_size:
+        return False
+    if from_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if not checksum or hash_file(from_path) != hash_file(dest_path):
+        return False
+    # Same bytes, so align the mtime and let the next sync skip the hashing
+    os.utime(dest_path, ns=(dest_stat.st_atime_ns, from_stat.st_mtime_ns))
+    return True
+
+
+def sync_file(from_path: str, dest_path: str, link: bool = False):
+    """Publishes one static file, as a hard link when asked and possible."""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    # Never write through an existing file, it may be a hard link to the source
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    if link:
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            pass
+    shutil.copy2(from_path, dest_path)
+
+
+def sync_files(
+    source_dir_path: str,
+    dest_dir_path: str,
+    manifest_path: str,
+    checksum: bool = False,
+    link: bool = False,
+    workers: int = None,
+    scan: SiteScan = None,
+    published_dir_path: str = None,
+) -> list:
+    """Mirrors the static directory into the destination, copying only changed files.
+
+    Copies run on a thread pool. Files published by an earlier sync whose source is
+    gone are removed. A build that already scanned the site passes its scan, whose
+    assets must have been scanned for this destination. A build into a staging
+    directory passes the published directory, whose up to date copies are
+    hard-linked instead of copied again. Returns the synced destination paths.
+    """
+    if scan is None:
+        scan = scan_site(None, source_dir_path, dest_dir_path)
+    old_outputs = load_manifest(manifest_path)
+    new_outputs = {}
+    pending = []
+    for from_path, dest_path in scan.assets:
+        new_outputs[dest_path] = {"source": from_path}
+        from_stat = scan.stats.get(from_path)
+        if is_file_unchanged(from_path, dest_path, checksum, from_stat):
+            continue
+        if published_dir_path is not None:
+            published_path = os.path.join(
+                published_dir_path, os.path.relpath(dest_path, dest_dir_path)
+            )
+            if is_file_unchanged(from_path, published_path, checksum, from_stat):
+                pending.append((published_path, dest_path, True))
+                continue
+        pending.append((from_path, dest_path, link))
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-        else:
-            copy_files_recursive(from_path, dest_path)
+    for dest_path in sorted(old_outputs.keys() - new_outputs.keys()):
+        remove_output(dest_path, dest_dir_path)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() so that the first failed copy is raised here
+        list(pool.map(lambda job: sync_file(*job), pending))
+    save_manifest(manifest_path, new_outputs)
+    for _, dest_path, _ in pending:
+        logger.debug(" * synced %s", dest_path)
+    logger.info(
+        "synced %d of %d static files from %s to %s",
+        len(pending),
+        len(new_outputs),
+        source_dir_path,
+        dest_dir_path,
+    )
+    return [dest_path for _, dest_path, _ in pending]
+
+
+class PageGenerationError(Exception):
+    """Raised after a build when one or more pages failed to render."""
+
+    def __init__(self, failures: list):
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to generate:"]
+        for from_path, message in failures:
+            lines.append(f"  {from_path}: {message}")
+        super().__init__("\n".join(lines))
 
 
 def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str):
     """Generates html pages based on the template by populating it's content from markdown file."""
-    print(f"generating page from {from_path} to {dest_path} using {template_path}")
+    template = load_template(template_path, basepath)
+    render_page(from_path, template, dest_path)
+
+
+def render_page(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    summarize: bool = False,
+) -> dict:
+    """Renders one markdown file into an already compiled template.
+
+    With summarize, returns the page_summary() of the page for the site artifacts.
+    """
+    logger.debug("generating page from %s to %s", from_path, dest_path)
+    if profiler is not None or cache is not None:
+        return render_page_staged(
+            from_path, template, dest_path, profiler, cache, summarize
+        )
+    # The title goes before the content, so find it first and then stream the body
     with open(from_path, "r") as from_file:
-        markdown = from_file.read()
-    with open(template_path, "r") as template_file:
-        template = template_file.read()
-    html_obj = markdown_to_html_node(markdown)
-    html = html_obj.to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
+        metadata, lines = split_front_matter(from_file)
+        title = page_title(metadata, lines)
     dest_dir = os.path.dirname(dest_path)
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir)
-    with open(dest_path, "w") as dest_file:
-        dest_file.write(template)
+    texts = [] if summarize else None
+    with open(from_path, "r") as from_file, write_if_changed(dest_path) as dest_file:
+        _, lines = split_front_matter(from_file)
+        content = iter_markdown_html(lines, template.basepath, texts)
+        template.write_to(dest_file, Title=title, Content=content)
+    if summarize:
+        return page_summary(title, metadata, texts)
+    return None
 
 
-def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str
-):
+def page_title(metadata: dict, lines) -> str:
+    """Returns the front matter title, or else the first h1 of the body lines."""
+    title = metadata.get("title")
+    if title is not None:
+        return str(title)
+    return extract_title_from_lines(lines)
+
+
+def render_page_staged(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    summarize: bool = False,
+) -> dict:
+    """Renders like render_page, but one stage after another.
+
+    This lets each stage be timed, and lets the render cache skip the parse stages.
+    """
+    profiler = profiler or Profiler()
+    with profiler.stage("read", from_path):
+        with open(from_path, "r") as from_file:
+            markdown = from_file.read()
+    cached = None
+    if cache is not None:
+        with profiler.stage("cache lookup", from_path):
+            cache_key = cache.key(markdown, template.basepath)
+            cached = cache.get(cache_key)
+    # Cache entries keep the search terms too, so a hit summarizes the same way
+    texts = [] if summarize or cache is not None else None
+    terms = None
+    if cached is not None:
+        title, content, terms = cached
+    else:
+        title, content = render_content(
+            markdown, template.basepath, profiler, from_path, texts
+        )
+        if cache is not None:
+            with profiler.stage("cache store", from_path):
+                content = "".join(content)
+                terms = search_terms(texts)
+                cache.put(cache_key, title, content, terms)
+    with profiler.stage("template fill", from_path):
+        page = template.render(Title=title, Content=content)
+    with profiler.stage("write", from_path):
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with write_if_changed(dest_path) as dest_file:
+            dest_file.write(page)
+    if summarize:
+        with profiler.stage("summary", from_path):
+            metadata, _ = split_front_matter(io.StringIO(markdown))
+            return page_summary(title, metadata, texts, terms)
+    return None
+
+
+def render_content(
+    markdown: str,
+    basepath: str,
+    profiler: Profiler,
+    from_path: str,
+    texts: list = None,
+) -> tuple:
+    """Returns the title and the html chunks of a markdown document, timing each stage.
+
+    When a texts list is given, the plain text of every block is appended to it.
+    """
+    with profiler.stage("front matter", from_path):
+        metadata, lines = split_front_matter(markdown.split("\n"))
+    result = parse_markdown(lines, profiler, from_path)
+    title = metadata.get("title")
+    title = result.require_title() if title is None else str(title)
+    with profiler.stage("html emit", from_path):
+        content = list(result.node.iter_html(basepath))
+    if texts is not None:
+        with profiler.stage("text", from_path):
+            texts.extend(result.node.iter_text())
+    return title, content
+
+
+def scan_content(
+    dir_path_content: str,
+    dest_dir_path: str,
+    include: tuple = PAGE_INCLUDE,
+    exclude: tuple = DEFAULT_EXCLUDE,
+) -> SiteScan:
     if not os.path.exists(dir_path_content):
         raise Exception("Content directory does not exist.")
+    return scan_site(dir_path_content, None, dest_dir_path, include, exclude)
+
+
+def collect_page_jobs(
+    dir_path_content: str,
+    dest_dir_path: str,
+    include: tuple = PAGE_INCLUDE,
+    exclude: tuple = DEFAULT_EXCLUDE,
+) -> list:
+    """Walks the content directory and returns (source, destination) pairs for every page."""
+    return scan_content(dir_path_content, dest_dir_path, include, exclude).pages
+
+
+# Each worker process receives the compiled template once, not once per page
+_worker_template = None
+_worker_profile = False
+_worker_cache = None
+_worker_summarize = False
+
+
+def _init_worker(
+    template: Template,
+    profile: bool = False,
+    cache: RenderCache = None,
+    inline_cache_size: int = None,
+    summarize: bool = False,
+    images: dict = None,
+):
+    global _worker_template, _worker_profile, _worker_cache, _worker_summarize
+    _worker_template = template
+    _worker_profile = profile
+    _worker_cache = cache
+    _worker_summarize = summarize
+    if inline_cache_size is not None:
+        set_inline_cache_size(inline_cache_size)
+    if images is not None:
+        set_image_table(images)
+
 
-    for filename in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            dest_path = dest_path.replace(".md", ".html")
-            generate_page(from_path, template_path, dest_path, basepath)
-        else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+def render_page_job(
+    job: tuple,
+    template: Template = None,
+    profile: bool = None,
+    cache: RenderCache = None,
+    summarize: bool = False,
+) -> tuple:
+    """Renders a single (source, destination) job.
+
+    Returns the source path, the error message if any, so that one broken page
+    doesn't abort the rest of the build, the page's profile when profiling and
+    its summary when summarizing.
+    """
+    from_path, dest_path = job
+    if template is None:
+        template, profile = _worker_template, _worker_profile
+        cache, summarize = _worker_cache, _worker_summarize
+    profiler = Profiler() if profile else None
+    if profiler is not None:
+        inline_before = inline_cache_info()
+    error = None
+    summary = None
+    try:
+        summary = render_page(
+            from_path, template, dest_path, profiler, cache, summarize
+        )
+    except Exception as err:
+        error = f"{type(err).__name__}: {err}"
+    if profiler is not None:
+        count_inline_cache(profiler, inline_before)
+    return from_path, error, profiler.to_dict() if profiler else None, summary
+
+
+def count_inline_cache(profiler: Profiler, before):
+    """Counts the inline memo hits and misses since the before cache info."""
+    after = inline_cache_info()
+    profiler.count("inline cache hits", after.hits - before.hits)
+    profiler.count("inline cache misses", after.misses - before.misses)
+
+
+def generate_pages(
+    page_jobs: list,
+    template_path: str,
+    basepath: str,
+    workers: int = 1,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    io_concurrency: int = None,
+    summarize: bool = False,
+) -> list:
+    """Renders (source, destination) page jobs, across a process pool when workers > 1.
+
+    The template is compiled once for the whole build. Every page is attempted;
+    failures are reported together in job order. With io_concurrency the pages go
+    through the asyncio pipeline instead, see generate_pages_async. Returns the
+    page summaries in job order when summarize is set.
+    """
+    template = load_template(template_path, basepath)
+    profile = profiler is not None
+    if io_concurrency:
+        with maybe_stage(profiler, "async pipeline"):
+            results = asyncio.run(
+                generate_pages_async(
+                    page_jobs,
+                    template,
+                    io_concurrency,
+                    workers,
+                    cache,
+                    summarize,
+                    profile,
+                )
+            )
+    elif workers > 1 and len(page_jobs) > 1:
+        chunksize = max(1, len(page_jobs) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                template,
+                profile,
+                cache,
+                inline_cache_info().maxsize,
+                summarize,
+                image_table(),
+            ),
+        ) as pool:
+            results = list(pool.map(render_page_job, page_jobs, chunksize=chunksize))
+    else:
+        results = [
+            render_page_job(job, template, profile, cache, summarize)
+            for job in page_jobs
+        ]
+
+    if profile:
+        for _, _, profile_data, _ in results:
+            if profile_data is not None:
+                profiler.merge(profile_data)
+    if cache is not None:
+        with maybe_stage(profiler, "cache eviction"):
+            cache.evict()
+    logger.info("generated %d pages", len(results))
+    failures = [(from_path, error) for from_path, error, _, _ in results if error]
+    if failures:
+        raise PageGenerationError(failures)
+    return [summary for _, _, _, summary in results]
+
+
+def read_text(path: str) -> str:
+    with open(path, "r") as text_file:
+        return text_file.read()
+
+
+def write_text(path: str, text: str):
+    with write_if_changed(path) as text_file:
+        text_file.write(text)
+
+
+def render_markdown(
+    markdown: str,
+    basepath: str,
+    cache: RenderCache = None,
+    summarize: bool = False,
+    profile: bool = False,
+    from_path: str = None,
+) -> tuple:
+    """Returns the title and html fragment of a markdown document, its summary with
+    summarize and its profile with profile.
+
+    The profile is a Profiler.to_dict() of the page's stages, named after from_path.
+    """
+    profiler = Profiler() if profile else None
+    if profiler is not None:
+        inline_before = inline_cache_info()
+    with maybe_stage(profiler, "front matter", from_path):
+        metadata, lines = split_front_matter(markdown.split("\n"))
+    cached = None
+    if cache is not None:
+        with maybe_stage(profiler, "cache lookup", from_path):
+            cache_key = cache.key(markdown, basepath)
+            cached = cache.get(cache_key)
+    terms = None
+    if cached is not None:
+        title, html, terms = cached
+    else:
+        result = parse_markdown(lines, profiler, from_path)
+        title = metadata.get("title")
+        title = result.require_title() if title is None else str(title)
+        with maybe_stage(profiler, "html emit", from_path):
+            html = result.node.to_html(basepath)
+        if summarize or cache is not None:
+            with maybe_stage(profiler, "text", from_path):
+                terms = search_terms(result.node.iter_text())
+        if cache is not None:
+            with maybe_stage(profiler, "cache store", from_path):
+                cache.put(cache_key, title, html, terms)
+    summary = None
+    if summarize:
+        summary = page_summary(title, metadata, [], terms)
+    if profiler is None:
+        return title, html, summary, None
+    count_inline_cache(profiler, inline_before)
+    return title, html, summary, profiler.to_dict()
+
+
+async def generate_pages_async(
+    page_jobs: list,
+    template: Template,
+    io_concurrency: int = 16,
+    workers: int = 1,
+    cache: RenderCache = None,
+    summarize: bool = False,
+    profile: bool = False,
+) -> list:
+    """Overlaps reading, rendering and writing pages, for slow or networked filesystems.
+
+    Up to io_concurrency pages are in flight at once. Reads and writes run on
+    threads, rendering on a process pool when workers > 1. Every output directory
+    is created once before any page is written. Returns render_page_job style results.
+    """
+    loop = asyncio.get_running_loop()
+    dest_dirs = sorted({os.path.dirname(dest_path) for _, dest_path in page_jobs})
+    await asyncio.to_thread(
+        lambda: [os.makedirs(dest_dir, exist_ok=True) for dest_dir in dest_dirs]
+    )
+    results = [None] * len(page_jobs)
+    pending_jobs = iter(enumerate(page_jobs))
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                template,
+                profile,
+                cache,
+                inline_cache_info().maxsize,
+                summarize,
+                image_table(),
+            ),
+        )
+    else:
+        # Rendering holds the GIL anyway, and one page at a time keeps the inline
+        # memo counts of each page's profile its own
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    def read_page(profiler: Profiler, from_path: str) -> str:
+        with maybe_stage(profiler, "read", from_path):
+            return read_text(from_path)
+
+    def write_page(profiler: Profiler, dest_path: str, page: str, from_path: str):
+        with maybe_stage(profiler, "write", from_path):
+            write_text(dest_path, page)
+
+    async def run_jobs():
+        # Every task pulls the next job from the shared iterator until none are left
+        for idx, (from_path, dest_path) in pending_jobs:
+            logger.debug("generating page from %s to %s", from_path, dest_path)
+            profiler = Profiler() if profile else None
+            try:
+                markdown = await asyncio.to_thread(read_page, profiler, from_path)
+                title, html, summary, page_profile = await loop.run_in_executor(
+                    executor,
+                    render_markdown,
+                    markdown,
+                    template.basepath,
+                    cache,
+                    summarize,
+                    profile,
+                    from_path,
+                )
+                if page_profile is not None:
+                    profiler.merge(page_profile)
+                with maybe_stage(profiler, "template fill", from_path):
+                    page = template.render(Title=title, Content=html)
+                await asyncio.to_thread(
+                    write_page, profiler, dest_path, page, from_path
+                )
+            except Exception as err:
+                error = f"{type(err).__name__}: {err}"
+                summary = None
+            else:
+                error = None
+            profile_data = profiler.to_dict() if profiler else None
+            results[idx] = (from_path, error, profile_data, summary)
+
+    try:
+        await asyncio.gather(*(run_jobs() for _ in range(io_concurrency)))
+    finally:
+        executor.shutdown()
+    return results
+
+
+def generate_pages_recursive(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    basepath: str,
+    workers: int = 1,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    io_concurrency: int = None,
+    listings: list = None,
+    metadata_cache: MetadataCache = None,
+    artifacts: SiteArtifacts = None,
+    scan: SiteScan = None,
+):
+    """Renders every page; a build that already scanned the site passes its scan."""
+    if scan is None:
+        with maybe_stage(profiler, "collect"):
+            scan = scan_content(dir_path_content, dest_dir_path)
+    page_jobs = scan.pages
+    if listings:
+        with maybe_stage(profiler, "listings"):
+            template = load_template(template_path, basepath)
+            generate_listings(
+                page_jobs,
+                template,
+                dest_dir_path,
+                listings,
+                metadata_cache,
+                scan.stats,
+            )
+    summaries = generate_pages(
+        page_jobs,
+        template_path,
+        basepath,
+        workers,
+        profiler,
+        cache,
+        io_concurrency,
+        summarize=artifacts is not None,
+    )
+    if artifacts is not None:
+        with maybe_stage(profiler, "site artifacts"):
+            for (_, dest_path), summary in zip(page_jobs, summaries):
+                artifacts.add(page_url(dest_path, dest_dir_path), summary)
+            artifacts.write(dest_dir_path, basepath)
+
+
+def generate_pages_incremental(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    basepath: str,
+    manifest_path: str,
+    workers: int = 1,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    io_concurrency: int = None,
+    listings: list = None,
+    metadata_cache: MetadataCache = None,
+    static_dir_path: str = None,
+    artifacts: SiteArtifacts = None,
+    scan: SiteScan = None,
+) -> list:
+    """Renders only the pages whose inputs changed since the build recorded in the manifest.
+
+    The manifest holds the dependency graph: every page's source, template,
+    partials and the files under static_dir_path it links to. Outputs whose
+    sources were removed are deleted. Listings are cheap to render from the
+    metadata index, so they are always regenerated. Page summaries are kept in
+    the manifest, so the site artifacts cover unchanged pages without rendering
+    them. Returns the rendered page destination paths.
+    """
+    if scan is None:
+        with maybe_stage(profiler, "collect"):
+            scan = scan_content(dir_path_content, dest_dir_path)
+    page_jobs = scan.pages
+    with maybe_stage(profiler, "manifest"):
+        old_outputs = load_manifest(manifest_path)
+        graph = DependencyGraph()
+        template_dependencies = load_template(template_path, basepath).dependencies
+        pending = []
+        for from_path, dest_path in page_jobs:
+            dest_key = os.path.normpath(dest_path)
+            old_entry = old_outputs.get(dest_key)
+            entry = graph.page_entry(
+                from_path, basepath, template_dependencies, static_dir_path, old_entry
+            )
+            reasons = rebuild_reasons(old_entry, entry, os.path.exists(dest_path))
+            if not reasons and artifacts is not None and "summary" not in old_entry:
+                reasons = ["no summary recorded for the site artifacts"]
+            if reasons:
+                logger.debug("rebuilding %s: %s", dest_key, ", ".join(reasons))
+                entry["reasons"] = reasons
+                pending.append((from_path, dest_path))
+            else:
+                entry["reasons"] = old_entry.get("reasons", [])
+                if "summary" in old_entry:
+                    entry["summary"] = old_entry["summary"]
+            graph.outputs[dest_key] = entry
+    new_outputs = graph.outputs
+
+    if listings:
+        with maybe_stage(profiler, "listings"):
+            template = load_template(template_path, basepath)
+            listing_paths = generate_listings(
+                page_jobs,
+                template,
+                dest_dir_path,
+                listings,
+                metadata_cache,
+                scan.stats,
+            )
+        for dest_key in listing_paths:
+            new_outputs[dest_key] = {"listing": True}
+    for dest_key in sorted(old_outputs.keys() - new_outputs.keys()):
+        remove_output(dest_key, dest_dir_path)
+    try:
+        summaries = generate_pages(
+            pending,
+            template_path,
+            basepath,
+            workers,
+            profiler,
+            cache,
+            io_concurrency,
+            summarize=artifacts is not None,
+        )
+    except PageGenerationError as err:
+        # Forget the failed pages so the next build retries them
+        failed = {os.path.normpath(from_path) for from_path, _ in err.failures}
+        new_outputs = {
+            dest_key: entry
+            for dest_key, entry in new_outputs.items()
+            if entry.get("source") not in failed
+        }
+        raise
+    else:
+        for (_, dest_path), summary in zip(pending, summaries):
+            if summary is not None:
+                new_outputs[os.path.normpath(dest_path)]["summary"] = summary
+    finally:
+        save_manifest(manifest_path, new_outputs)
+    if artifacts is not None:
+        with maybe_stage(profiler, "site artifacts"):
+            for dest_key, entry in new_outputs.items():
+                if "summary" in entry:
+                    artifacts.add(page_url(dest_key, dest_dir_path), entry["summary"])
+            artifacts.write(dest_dir_path, basepath)
+    return [os.path.normpath(dest_path) for _, dest_path in pending]
+
+
+def remove_output(dest_path: str, dest_dir_path: str):
+    """Deletes a stale output file and any directories it leaves empty."""
+    logger.info(" - removing %s", dest_path)
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    root = os.path.normpath(dest_dir_path)
+    dest_dir = os.path.dirname(dest_path)
+    while dest_dir.startswith(root + os.sep):
+        if not os.path.isdir(dest_dir) or os.listdir(dest_dir):
+            break
+        os.rmdir(dest_dir)
+        dest_dir = os.path.dirname(dest_dir)
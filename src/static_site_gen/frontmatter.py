@@ -0,0 +1,154 @@
+import itertools
+import json
+import logging
+import os
+
+from static_site_gen.markdownparser import match_title
+
+logger = logging.getLogger(__name__)
+
+# Opening delimiter -> key/value separator, "---" for YAML and "+++" for TOML style
+FRONT_MATTER_DELIMITERS = {"---": ":", "+++": "="}
+METADATA_CACHE_VERSION = 2
+
+
+def parse_value(text: str):
+    """Parses a scalar or an inline [a, b] list; anything else stays a string."""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        inner = text[1:-1].strip()
+        return [parse_value(item) for item in inner.split(",")] if inner else []
+    if text in ("true", "false"):
+        return text == "true"
+    for number_type in (int, float):
+        try:
+            return number_type(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_front_matter(lines: list, separator: str) -> dict:
+    """Parses flat key/value front matter, plus YAML "- item" lists under a bare key."""
+    metadata = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None and separator == ":":
+            if metadata[key] is None:
+                metadata[key] = []
+            elif not isinstance(metadata[key], list):
+                raise ValueError(f"Invalid front matter line: {stripped}")
+            metadata[key].append(parse_value(stripped[2:]))
+            continue
+        key, found, value = stripped.partition(separator)
+        if not found:
+            raise ValueError(f"Invalid front matter line: {stripped}")
+        key = key.strip()
+        metadata[key] = parse_value(value) if value.strip() else None
+    return metadata
+
+
+def split_front_matter(lines) -> tuple:
+    """Splits the front matter off an iterable of lines.
+
+    Returns the metadata and an iterator over the remaining body lines. Lines are
+    consumed only up to the closing delimiter, so the body is never read unless
+    the caller iterates it.
+    """
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return {}, lines
+    delimiter = first_line.rstrip()
+    if delimiter not in FRONT_MATTER_DELIMITERS:
+        return {}, itertools.chain([first_line], lines)
+    header = []
+    for line in lines:
+        if line.rstrip() == delimiter:
+            return parse_front_matter(header, FRONT_MATTER_DELIMITERS[delimiter]), lines
+        header.append(line)
+    raise ValueError(f"Front matter is missing its closing {delimiter}.")
+
+
+def read_front_matter(path: str) -> dict:
+    """Reads only the front matter of a markdown file."""
+    with open(path, "r") as markdown_file:
+        metadata, _ = split_front_matter(markdown_file)
+    return metadata
+
+
+def read_page_metadata(path: str) -> dict:
+    """Reads the front matter, filling in the title from the first h1 if it has none.
+
+    The body is only read up to that h1, it is never parsed. The title is None
+    when there is no h1 either.
+    """
+    with open(path, "r") as markdown_file:
+        metadata, lines = split_front_matter(markdown_file)
+        if "title" not in metadata:
+            titles = (match_title(line) for line in lines)
+            metadata["title"] = next((title for title in titles if title), None)
+    return metadata
+
+
+class MetadataCache:
+    """Page metadata, reused for as long as the file's mtime and size match.
+
+    With a cache_path the entries are loaded from and saved to a json file, so
+    listing pages over a large site only re-read the pages that changed.
+    """
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path
+        # path -> [mtime ns, size, metadata]
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "r") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == METADATA_CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        data = {"version": METADATA_CACHE_VERSION, "entries": self.entries}
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(data, cache_file, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+
+    def get(self, path: str, stat: os.stat_result = None) -> dict:
+        """Returns read_page_metadata() of a page; pass a stat result to save a syscall."""
+        path = os.path.normpath(path)
+        if stat is None:
+            stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        metadata = read_page_metadata(path)
+        self.entries[path] = [stat.st_mtime_ns, stat.st_size, metadata]
+        return metadata
+
+    def prune(self, paths: set):
+        """Drops the entries of pages that are not in paths, e.g. deleted ones."""
+        paths = {os.path.normpath(path) for path in paths}
+        for path in self.entries.keys() - paths:
+            del self.entries[path]
+
+    def __repr__(self):
+        return f"MetadataCache({self.cache_path=}, {len(self.entries)} entries)"
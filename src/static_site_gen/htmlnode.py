@@ -1,4 +1,10 @@
+URL_PROPS = ("href", "src")
+
+
 class HTMLNode:
+    # Slots instead of a per-instance __dict__, parsed trees are kept around in bulk
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str = None,
@@ -11,14 +17,33 @@ class HTMLNode:
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def iter_html(self, basepath: str = "/"):
+        """Yields the node's html as chunks, so large trees never build one big string."""
         raise NotImplementedError
 
-    def props_to_html(self):
+    def iter_text(self):
+        """Yields the node's text content without any markup, e.g. for search indexing."""
+        raise NotImplementedError
+
+    def to_html(self, basepath: str = "/"):
+        return "".join(self.iter_html(basepath))
+
+    def write_to(self, fp, basepath: str = "/"):
+        fp.writelines(self.iter_html(basepath))
+
+    def props_to_html(self, basepath: str = "/"):
         if self.props is None:
             return None
         props_html = ""
         for prop, value in self.props.items():
+            # Root-relative links and sources are served from under the basepath
+            if prop in URL_PROPS and basepath != "/" and value.startswith("/"):
+                value = basepath + value[1:]
+            elif prop == "srcset" and basepath != "/":
+                value = ", ".join(
+                    basepath + candidate[1:] if candidate.startswith("/") else candidate
+                    for candidate in value.split(", ")
+                )
             props_html += f' {prop}="{value}"'
         return props_html
 
@@ -35,43 +60,59 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props: list = None):
         super().__init__(tag, value, props=props)
 
-    def to_html(self):
+    def to_html(self, basepath: str = "/"):
         if self.value is None:
             raise ValueError("LeafNode must have value")
         if self.props is not None and self.tag is None:
             raise ValueError("LeafNode with props requires a tag.")
         if self.tag == "img":
-            return f"<{self.tag}{self.props_to_html()} />"
+            return f"<{self.tag}{self.props_to_html(basepath)} />"
         if self.props is None:
             if self.tag is None:
                 return f"{self.value}"
             return f"<{self.tag}>{self.value}</{self.tag}>"
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(basepath)}>{self.value}</{self.tag}>"
+
+    def iter_html(self, basepath: str = "/"):
+        yield self.to_html(basepath)
+
+    def iter_text(self):
+        if self.value:
+            yield self.value
+        elif self.props is not None and self.props.get("alt"):
+            yield self.props["alt"]
 
     def __repr__(self):
         return f"LeafNode({self.tag=}, {self.value=}, {self.props=})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props: dict = None):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
+    def iter_html(self, basepath: str = "/"):
         if self.tag is None:
             raise ValueError("Parent node needs a tag.")
         if self.children is None:
             raise ValueError("Parent node requires children")
         if self.props is not None:
-            parent_node_html = f"<{self.tag}{self.props_to_html()}>"
+            yield f"<{self.tag}{self.props_to_html(basepath)}>"
         else:
-            parent_node_html = f"<{self.tag}>"
+            yield f"<{self.tag}>"
+        for child_node in self.children:
+            yield from child_node.iter_html(basepath)
+        yield f"</{self.tag}>"
+
+    def iter_text(self):
         for child_node in self.children:
-            parent_node_html += child_node.to_html()
-        parent_node_html += f"</{self.tag}>"
-        return parent_node_html
+            yield from child_node.iter_text()
 
     def __repr__(self):
         return f"ParentNode({self.tag=}, {self.children=}, {self.props=})"
@@ -0,0 +1,243 @@
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from static_site_gen.file_handler import is_file_unchanged, remove_output, sync_file
+from static_site_gen.manifest import hash_file, load_manifest, save_manifest
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# Formats whose variants are resized and re-encoded; gifs may be animated
+RESIZED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+DEFAULT_WIDTHS = (480, 960, 1440)
+IMAGE_CACHE_VERSION = 2
+JPEG_QUALITY = 82
+# Start of frame markers, the ones that hold a jpeg's size
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that turn the image a quarter, so it displays with its sides swapped
+QUARTER_TURN_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def read_png_size(header: bytes) -> tuple:
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    return None
+
+
+def read_gif_size(header: bytes) -> tuple:
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", header[6:10])
+    return None
+
+
+def read_jpeg_size(image_file) -> tuple:
+    image_file.seek(2)
+    while True:
+        marker = image_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0x01, 0xD8) or 0xD0 <= marker[1] <= 0xD7:
+            # Markers without a length
+            continue
+        length = image_file.read(2)
+        if len(length) < 2:
+            return None
+        if marker[1] in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", image_file.read(5))
+            return width, height
+        image_file.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def image_size(path: str) -> tuple:
+    """Returns an image's displayed (width, height), or None if it can't tell.
+
+    PNG, GIF and JPEG headers are read directly; other formats need Pillow.
+    With Pillow, the size is also turned the way the image's EXIF orientation
+    displays it, e.g. for portrait phone photos stored sideways.
+    """
+    with open(path, "rb") as image_file:
+        header = image_file.read(24)
+        size = read_png_size(header) or read_gif_size(header)
+        if size is None and header[:2] == b"\xff\xd8":
+            size = read_jpeg_size(image_file)
+    if Image is None:
+        return size
+    try:
+        with Image.open(path) as image:
+            size = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION)
+    except OSError:
+        return size
+    if orientation in QUARTER_TURN_ORIENTATIONS:
+        size = size[1], size[0]
+    return size
+
+
+def variant_url(url: str, width: int) -> str:
+    stem, extension = os.path.splitext(url)
+    return f"{stem}-{width}w{extension}"
+
+
+def resize_image(source_path: str, cache_path: str, width: int, height: int):
+    """Writes a resized, re-encoded copy of an image to the variant cache.
+
+    The variant is turned upright first, as its EXIF orientation says.
+    """
+    with Image.open(source_path) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("P", "1"):
+            image = image.convert("RGBA")
+        resized = image.resize((width, height), Image.LANCZOS)
+    options = {"optimize": True}
+    if image_format == "JPEG":
+        options.update(quality=JPEG_QUALITY, progressive=True)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        resized.save(tmp_path, format=image_format, **options)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def resize_job(job: tuple):
+    resize_image(*job)
+
+
+class ImageCache:
+    """Resized variants on disk, keyed by the source's content hash and the width.
+
+    A variant is only resized once, however often the build runs or the image
+    is renamed, and a cache directory can be shared between checkouts.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def variant_path(self, source_hash: str, width: int, extension: str) -> str:
+        name = f"{source_hash}-v{IMAGE_CACHE_VERSION}-{width}w{extension}"
+        return os.path.join(self.cache_dir, source_hash[:2], name)
+
+    def __repr__(self):
+        return f"ImageCache({self.cache_dir=})"
+
+
+def plan_images(
+    assets: list,
+    dest_dir_path: str,
+    cache_dir: str,
+    widths: tuple = DEFAULT_WIDTHS,
+) -> tuple:
+    """Measures the static images and picks the variants narrower than each one.
+
+    assets are the (source, destination) pairs of the static sync. Without
+    Pillow there are no variants. Returns the table for set_image_table() and
+    the (source, cache path, width, height, destination) of every variant.
+    """
+    image_cache = ImageCache(cache_dir)
+    table = {}
+    variants = []
+    asset_dest_paths = {dest_path for _, dest_path in assets}
+    for from_path, dest_path in assets:
+        extension = os.path.splitext(from_path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            continue
+        size = image_size(from_path)
+        if size is None:
+            logger.warning("can't read the size of %s, leaving it as is", from_path)
+            continue
+        width, height = size
+        url = "/" + os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+        image = {"width": width, "height": height, "variants": []}
+        table[url] = image
+        if Image is None or extension not in RESIZED_EXTENSIONS:
+            continue
+        source_hash = hash_file(from_path)
+        for variant_width in sorted(set(widths)):
+            if variant_width >= width:
+                break
+            variant_height = max(1, round(height * variant_width / width))
+            cache_path = image_cache.variant_path(source_hash, variant_width, extension)
+            variant_dest_path = variant_url(dest_path, variant_width)
+            if variant_dest_path in asset_dest_paths:
+                logger.warning(
+                    "%s is a static file, not resizing to it", variant_dest_path
+                )
+                continue
+            variants.append(
+                (
+                    from_path,
+                    cache_path,
+                    variant_width,
+                    variant_height,
+                    variant_dest_path,
+                )
+            )
+            image["variants"].append([variant_url(url, variant_width), variant_width])
+    return table, variants
+
+
+def process_images(
+    assets: list,
+    dest_dir_path: str,
+    manifest_path: str,
+    cache_dir: str,
+    widths: tuple = DEFAULT_WIDTHS,
+    workers: int = None,
+    link: bool = False,
+) -> dict:
+    """Measures the static images and publishes resized variants next to them.
+
+    Variants are resized on a process pool, only when the cache doesn't have
+    them yet, and copied into the destination; the ones an earlier run
+    published that are no longer wanted are removed. Returns the table for
+    set_image_table().
+    """
+    if Image is None:
+        logger.info("Pillow is not installed, images are published at their own size")
+    table, variants = plan_images(assets, dest_dir_path, cache_dir, widths)
+    old_outputs = load_manifest(manifest_path)
+    new_outputs = {}
+    # Identical images share their cached variants
+    pending = list(
+        {
+            variant[1]: variant[:4]
+            for variant in variants
+            if not os.path.exists(variant[1])
+        }.values()
+    )
+    if workers == 1 or len(pending) < 2:
+        for job in pending:
+            resize_job(job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # list() so that the first failed resize is raised here
+            list(pool.map(resize_job, pending))
+
+    published = 0
+    for _, cache_path, _, _, dest_path in variants:
+        new_outputs[dest_path] = {"source": cache_path}
+        if not is_file_unchanged(cache_path, dest_path):
+            sync_file(cache_path, dest_path, link=link)
+            published += 1
+    for dest_path in sorted(old_outputs.keys() - new_outputs.keys()):
+        remove_output(dest_path, dest_dir_path)
+    save_manifest(manifest_path, new_outputs)
+    logger.info(
+        "measured %d images, resized %d and published %d of %d variants",
+        len(table),
+        len(pending),
+        published,
+        len(variants),
+    )
+    return table
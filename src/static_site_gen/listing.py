@@ -0,0 +1,226 @@
+import logging
+import math
+import os
+
+from static_site_gen.frontmatter import MetadataCache
+from static_site_gen.htmlnode import LeafNode, ParentNode
+from static_site_gen.publish import write_if_changed
+from static_site_gen.template import Template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PER_PAGE = 10
+LISTING_SORTS = ("date", "title")
+
+
+def page_url(dest_path: str, dest_dir_path: str) -> str:
+    """Returns the site url of an output file, leaving off a trailing index.html."""
+    relative_path = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if relative_path == "index.html":
+        return "/"
+    if relative_path.endswith("/index.html"):
+        return "/" + relative_path[: -len("index.html")]
+    return "/" + relative_path
+
+
+class PageEntry:
+    """One page of the site index: its source, url and metadata."""
+
+    __slots__ = ("source", "url", "metadata")
+
+    def __init__(self, source: str, url: str, metadata: dict):
+        self.source = source
+        self.url = url
+        self.metadata = metadata
+
+    @property
+    def title(self) -> str:
+        title = self.metadata.get("title")
+        return self.url if title is None else str(title)
+
+    @property
+    def date(self) -> str:
+        date = self.metadata.get("date")
+        return None if date is None else str(date)
+
+    def __repr__(self):
+        return f"PageEntry({self.source=}, {self.url=}, {self.metadata=})"
+
+
+class SiteIndex:
+    """The url and metadata of every page, collected in one pass over the page jobs."""
+
+    def __init__(self):
+        self.pages = []
+
+    def add(self, entry: PageEntry):
+        self.pages.append(entry)
+
+    def section(self, section: str) -> list:
+        """Returns the pages below a section such as "blog", but not its own index."""
+        prefix = f"/{section.strip('/')}/"
+        return [
+            page
+            for page in self.pages
+            if page.url.startswith(prefix) and page.url != prefix
+        ]
+
+    def __repr__(self):
+        return f"SiteIndex({len(self.pages)} pages)"
+
+
+def build_site_index(
+    page_jobs: list,
+    dest_dir_path: str,
+    metadata_cache: MetadataCache = None,
+    stats: dict = None,
+) -> SiteIndex:
+    """Indexes (source, destination) page jobs from their metadata, without parsing any body.
+
+    stats maps normalized source paths to stat results the caller already has.
+    """
+    if metadata_cache is None:
+        metadata_cache = MetadataCache()
+    if stats is None:
+        stats = {}
+    site_index = SiteIndex()
+    for from_path, dest_path in page_jobs:
+        source = os.path.normpath(from_path)
+        site_index.add(
+            PageEntry(
+                source,
+                page_url(dest_path, dest_dir_path),
+                metadata_cache.get(source, stats.get(source)),
+            )
+        )
+    return site_index
+
+
+def sort_pages(pages: list, sort: str = "date") -> list:
+    """Sorts by title, or newest first by date with undated pages last."""
+    pages = sorted(pages, key=lambda page: page.title)
+    if sort == "title":
+        return pages
+    if sort != "date":
+        raise ValueError(f"Unknown listing sort {sort}.")
+    dated = [page for page in pages if page.date is not None]
+    undated = [page for page in pages if page.date is None]
+    # sorted() is stable, so pages of the same date stay in title order
+    return sorted(dated, key=lambda page: page.date, reverse=True) + undated
+
+
+def listing_to_html_node(
+    title: str, pages: list, newer_url: str = None, older_url: str = None
+) -> ParentNode:
+    children = [LeafNode("h1", title)]
+    items = []
+    for page in pages:
+        item = [LeafNode("a", page.title, {"href": page.url})]
+        if page.date is not None:
+            item.append(LeafNode(None, " "))
+            item.append(LeafNode("time", page.date, {"datetime": page.date}))
+        items.append(ParentNode("li", item))
+    if items:
+        children.append(ParentNode("ul", items))
+    links = []
+    if newer_url is not None:
+        links.append(LeafNode("a", "Newer", {"href": newer_url, "rel": "prev"}))
+    if older_url is not None:
+        links.append(LeafNode("a", "Older", {"href": older_url, "rel": "next"}))
+    if links:
+        children.append(ParentNode("nav", links))
+    return ParentNode("div", children)
+
+
+class Listing:
+    """A paginated list of the pages in a content section, e.g. every post under blog/."""
+
+    def __init__(
+        self, section: str, per_page: int = DEFAULT_PER_PAGE, sort: str = "date"
+    ):
+        if per_page < 1:
+            raise ValueError("A listing needs at least one page per page.")
+        self.section = section.strip("/")
+        self.per_page = per_page
+        self.sort = sort
+
+    @property
+    def url(self) -> str:
+        return f"/{self.section}/"
+
+    @property
+    def title(self) -> str:
+        return self.section.rsplit("/", 1)[-1].replace("-", " ").title()
+
+    def page_url(self, number: int) -> str:
+        if number == 1:
+            return self.url
+        return f"{self.url}page/{number}/"
+
+    def render(
+        self, site_index: SiteIndex, template: Template, dest_dir_path: str
+    ) -> list:
+        """Writes every listing page and returns their destination paths.
+
+        The section is sorted once, after that each page only renders its own slice.
+        """
+        if any(page.url == self.url for page in site_index.pages):
+            raise ValueError(
+                f"Listing of {self.section} would overwrite the page at {self.url}."
+            )
+        pages = sort_pages(site_index.section(self.section), self.sort)
+        page_count = max(1, math.ceil(len(pages) / self.per_page))
+        dest_paths = []
+        for number in range(1, page_count + 1):
+            title = self.title if number == 1 else f"{self.title}, page {number}"
+            start = (number - 1) * self.per_page
+            node = listing_to_html_node(
+                title,
+                pages[start : start + self.per_page],
+                self.page_url(number - 1) if number > 1 else None,
+                self.page_url(number + 1) if number < page_count else None,
+            )
+            dest_path = os.path.join(
+                dest_dir_path,
+                *self.page_url(number).strip("/").split("/"),
+                "index.html",
+            )
+            logger.debug(" * listing %s -> %s", self.section, dest_path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with write_if_changed(dest_path) as dest_file:
+                template.write_to(
+                    dest_file,
+                    Title=title,
+                    Content=node.iter_html(template.basepath),
+                )
+            dest_paths.append(os.path.normpath(dest_path))
+        return dest_paths
+
+    def __repr__(self):
+        return f"Listing({self.section=}, {self.per_page=}, {self.sort=})"
+
+
+def generate_listings(
+    page_jobs: list,
+    template: Template,
+    dest_dir_path: str,
+    listings: list,
+    metadata_cache: MetadataCache = None,
+    stats: dict = None,
+) -> list:
+    """Indexes the page jobs once and writes every listing. Returns the written paths."""
+    if metadata_cache is None:
+        metadata_cache = MetadataCache()
+    site_index = build_site_index(page_jobs, dest_dir_path, metadata_cache, stats)
+    dest_paths = []
+    for listing in listings:
+        dest_paths.extend(listing.render(site_index, template, dest_dir_path))
+    metadata_cache.prune({from_path for from_path, _ in page_jobs})
+    metadata_cache.save()
+    logger.info(
+        "generated %d listing pages, %d of %d page metadata reads were cached",
+        len(dest_paths),
+        metadata_cache.hits,
+        metadata_cache.hits + metadata_cache.misses,
+    )
+    return dest_paths
@@ -1,23 +1,526 @@
-import shutil
+import argparse
+import logging
 import os
 import sys
 
+from static_site_gen.dependencies import DependencyGraph
 from static_site_gen.file_handler import (
-    copy_files_recursive,
+    generate_pages_incremental,
     generate_pages_recursive,
+    sync_files,
 )
+from static_site_gen.frontmatter import MetadataCache
+from static_site_gen.images import DEFAULT_WIDTHS, plan_images, process_images
+from static_site_gen.listing import (
+    DEFAULT_PER_PAGE,
+    LISTING_SORTS,
+    Listing,
+    generate_listings,
+    page_url,
+)
+from static_site_gen.manifest import load_manifest
+from static_site_gen.markdownparser import (
+    INLINE_CACHE_SIZE,
+    inline_cache_info,
+    set_image_table,
+    set_inline_cache_size,
+)
+from static_site_gen.profiling import Profiler, maybe_stage
+from static_site_gen.publish import prepare_staging, publish_staging
+from static_site_gen.render_cache import DEFAULT_CACHE_SIZE, RenderCache
+from static_site_gen.scanner import DEFAULT_EXCLUDE, PAGE_INCLUDE, SiteScan, scan_site
+from static_site_gen.sharding import (
+    build_shard,
+    merge_shards,
+    parse_shard,
+    run_local_shards,
+)
+from static_site_gen.site_artifacts import SiteArtifacts
+from static_site_gen.template import load_template
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the site from ./content.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep ./docs and only re-render pages whose inputs changed",
+    )
+    parser.add_argument(
+        "--manifest",
+        default="./.ssg-manifest.json",
+        help="where incremental builds keep their source hashes",
+    )
+    parser.add_argument(
+        "--explain",
+        metavar="OUTPUT",
+        help="print why an output, e.g. docs/index.html, was last rebuilt and exit",
+    )
+    parser.add_argument(
+        "--static-manifest",
+        default="./.ssg-static-manifest.json",
+        help="where static syncs record the files they published",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by hash when their mtimes differ",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hard-link static files into ./docs instead of copying them",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages on N worker processes (0 uses every cpu)",
+    )
+    parser.add_argument(
+        "--async-io",
+        type=int,
+        default=None,
+        metavar="N",
+        help="overlap reads, rendering and writes with N pages in flight",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("SSG_CACHE_DIR"),
+        help="reuse rendered pages from this directory (default: $SSG_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="evict the least recently used pages beyond this many MiB",
+    )
+    parser.add_argument(
+        "--inline-cache-size",
+        type=int,
+        default=INLINE_CACHE_SIZE,
+        help="inline fragments to memoize per process, 0 disables the memo",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="content files to render as pages (default: *.md); a glob with a "
+        "slash matches the path under ./content, one without matches the name",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip matching content and static files or directories, e.g. drafts; "
+        "editor swap and backup files are always skipped",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="give img tags their size, lazy loading and a srcset of resized "
+        "variants (resizing needs Pillow)",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=image_widths,
+        default=DEFAULT_WIDTHS,
+        metavar="W,W,...",
+        help="widths of the resized variants, default "
+        + ",".join(map(str, DEFAULT_WIDTHS)),
+    )
+    parser.add_argument(
+        "--image-cache-dir",
+        default="./.ssg-image-cache",
+        help="where resized variants are kept, by source hash",
+    )
+    parser.add_argument(
+        "--image-manifest",
+        default="./.ssg-image-manifest.json",
+        help="where image processing records the variants it published",
+    )
+    parser.add_argument(
+        "--listing",
+        action="append",
+        default=[],
+        metavar="SECTION",
+        help="generate paginated index pages for a content section, e.g. blog",
+    )
+    parser.add_argument(
+        "--listing-sort",
+        choices=LISTING_SORTS,
+        default="date",
+        help="order listed pages by front matter date (newest first) or title",
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        default=DEFAULT_PER_PAGE,
+        help="pages linked from each listing page",
+    )
+    parser.add_argument(
+        "--metadata-cache",
+        default="./.ssg-metadata.json",
+        help="where listings keep page metadata between builds",
+    )
+    parser.add_argument(
+        "--site-url",
+        help="absolute site url, e.g. https://example.com; writes sitemap.xml, "
+        "feed.xml and the search index",
+    )
+    parser.add_argument("--feed-title", help="title of feed.xml (default: site url)")
+    parser.add_argument("--no-sitemap", action="store_true", help="skip sitemap.xml")
+    parser.add_argument("--no-rss", action="store_true", help="skip feed.xml")
+    parser.add_argument(
+        "--no-search", action="store_true", help="skip the search index"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build stage and page and print the slowest ones",
+    )
+    parser.add_argument(
+        "--trace", help="also write the profile as a Chrome trace json to this file"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log every file processed"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only log warnings and errors"
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_spec,
+        metavar="I/N",
+        help="render only shard I of N (0 <= I < N) into --shard-dir, for --merge-shards",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        type=int,
+        metavar="N",
+        help="publish ./docs from the outputs of shards 0/N to N-1/N",
+    )
+    parser.add_argument(
+        "--local-shards",
+        type=int,
+        metavar="N",
+        help="build N shards as separate processes, then merge them",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        default="./.ssg-shards",
+        help="where shards write their outputs and manifests",
+    )
+    args = parser.parse_args(argv)
+    # Shard processes are started with the same arguments
+    args.argv = list(argv)
+    shard_modes = [args.shard, args.merge_shards, args.local_shards]
+    if sum(mode is not None for mode in shard_modes) > 1:
+        parser.error("use only one of --shard, --merge-shards and --local-shards")
+    if any(mode is not None for mode in shard_modes) and args.incremental:
+        parser.error("sharded builds are full builds, drop --incremental")
+    for count in (args.merge_shards, args.local_shards):
+        if count is not None and count < 1:
+            parser.error("the shard count must be a positive number")
+    if args.jobs < 0:
+        parser.error("--jobs must be zero or a positive number")
+    if args.async_io is not None and args.async_io < 1:
+        parser.error("--async-io must be a positive number")
+    if args.per_page < 1:
+        parser.error("--per-page must be a positive number")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def shard_spec(text: str) -> tuple:
+    try:
+        return parse_shard(text)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def image_widths(text: str) -> tuple:
+    try:
+        widths = tuple(int(width) for width in text.split(","))
+    except ValueError:
+        widths = ()
+    if not widths or min(widths) < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not a list of positive widths")
+    return widths
+
+
+def scan_globs(args: argparse.Namespace) -> tuple:
+    return tuple(args.include or PAGE_INCLUDE), DEFAULT_EXCLUDE + tuple(args.exclude)
+
+
+def scan(args: argparse.Namespace, profiler: Profiler, dest_dir_path: str) -> SiteScan:
+    """Lists the pages and static assets of the build in one walk."""
+    if not os.path.exists("./content"):
+        raise Exception("Content directory does not exist.")
+    with maybe_stage(profiler, "scan"):
+        return scan_site("./content", "./static", dest_dir_path, *scan_globs(args))
+
+
+def sync_static(
+    args: argparse.Namespace,
+    profiler: Profiler = None,
+    dest_dir_path: str = "./docs",
+    site_scan: SiteScan = None,
+    published_dir_path: str = None,
+):
+    with maybe_stage(profiler, "static sync"):
+        sync_files(
+            "./static",
+            dest_dir_path,
+            args.static_manifest,
+            checksum=args.checksum,
+            link=args.link_static,
+            scan=site_scan,
+            published_dir_path=published_dir_path,
+        )
+
+
+def prepare_images(
+    args: argparse.Namespace,
+    profiler: Profiler,
+    site_scan: SiteScan,
+    dest_dir_path: str,
+    publish: bool = True,
+):
+    """Processes the static images for --images and sets the table img tags are built from.
+
+    A shard only renders pages, so it measures the images without publishing
+    variants; the merge publishes them.
+    """
+    table = {}
+    if args.images:
+        with maybe_stage(profiler, "images"):
+            if publish:
+                table = process_images(
+                    site_scan.assets,
+                    dest_dir_path,
+                    args.image_manifest,
+                    args.image_cache_dir,
+                    args.image_widths,
+                    workers=args.jobs,
+                    link=args.link_static,
+                )
+            else:
+                table, _ = plan_images(
+                    site_scan.assets,
+                    dest_dir_path,
+                    args.image_cache_dir,
+                    args.image_widths,
+                )
+    # Also resets a table left over from the previous build of a daemon
+    set_image_table(table)
+
+
+def build(
+    args: argparse.Namespace,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    metadata_cache: MetadataCache = None,
+):
+    """Builds the site; the build daemon passes in the caches it keeps warm."""
+    basepath = args.basepath
+    if args.cache_dir:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    listings = [
+        Listing(section, args.per_page, args.listing_sort) for section in args.listing
+    ]
+    if listings and metadata_cache is None:
+        metadata_cache = MetadataCache(args.metadata_cache)
+    artifacts = None
+    if args.site_url:
+        artifacts = SiteArtifacts(
+            args.site_url,
+            args.feed_title,
+            sitemap=not args.no_sitemap,
+            rss=not args.no_rss,
+            search=not args.no_search,
+        )
+    if args.shard is not None:
+        include, exclude = scan_globs(args)
+        prepare_images(args, profiler, scan(args, profiler, "./docs"), "./docs", False)
+        build_shard(
+            "./content/",
+            "./template.html",
+            args.shard_dir,
+            basepath,
+            *args.shard,
+            workers=args.jobs,
+            profiler=profiler,
+            cache=cache,
+            io_concurrency=args.async_io,
+            include=include,
+            exclude=exclude,
+        )
+        return
+    if args.incremental:
+        site_scan = scan(args, profiler, "./docs")
+        sync_static(args, profiler, site_scan=site_scan)
+        prepare_images(args, profiler, site_scan, "./docs")
+        generate_pages_incremental(
+            "./content/",
+            "./template.html",
+            "./docs/",
+            basepath,
+            args.manifest,
+            workers=args.jobs,
+            profiler=profiler,
+            cache=cache,
+            io_concurrency=args.async_io,
+            listings=listings,
+            metadata_cache=metadata_cache,
+            static_dir_path="./static",
+            artifacts=artifacts,
+            scan=site_scan,
+        )
+        return
+    # A full rebuild invalidates whatever the last incremental build recorded
+    for manifest_path in (args.manifest, args.static_manifest, args.image_manifest):
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    # Build next to ./docs, which keeps serving the previous build until the swap
+    staging_dir = prepare_staging("./docs")
+    site_scan = scan(args, profiler, staging_dir)
+    # Static files that didn't change are linked from ./docs rather than copied
+    sync_static(args, profiler, staging_dir, site_scan, "./docs")
+    prepare_images(args, profiler, site_scan, staging_dir)
+    # They list staging paths, and the swap makes ./docs match the sources anyway
+    for manifest_path in (args.static_manifest, args.image_manifest):
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    shard_count = args.merge_shards or args.local_shards
+    if shard_count:
+        merge(
+            args,
+            profiler,
+            shard_count,
+            staging_dir,
+            site_scan,
+            listings,
+            metadata_cache,
+            artifacts,
+        )
+    else:
+        generate_pages_recursive(
+            "./content/",
+            "./template.html",
+            staging_dir,
+            basepath,
+            workers=args.jobs,
+            profiler=profiler,
+            cache=cache,
+            io_concurrency=args.async_io,
+            listings=listings,
+            metadata_cache=metadata_cache,
+            artifacts=artifacts,
+            scan=site_scan,
+        )
+    with maybe_stage(profiler, "publish"):
+        publish_staging(staging_dir, "./docs")
+
+
+def merge(
+    args: argparse.Namespace,
+    profiler: Profiler,
+    shard_count: int,
+    staging_dir: str,
+    site_scan: SiteScan,
+    listings: list,
+    metadata_cache: MetadataCache,
+    artifacts: SiteArtifacts,
+):
+    """Fills the staging directory from the shard outputs instead of rendering pages.
+
+    Listings only need page metadata, so they are rendered here from the whole
+    site rather than split across shards.
+    """
+    with maybe_stage(profiler, "merge shards"):
+        summaries = merge_shards(
+            args.shard_dir, shard_count, args.basepath, site_scan.pages, staging_dir
+        )
+    if listings:
+        with maybe_stage(profiler, "listings"):
+            template = load_template("./template.html", args.basepath)
+            generate_listings(
+                site_scan.pages,
+                template,
+                staging_dir,
+                listings,
+                metadata_cache,
+                site_scan.stats,
+            )
+    if artifacts is not None:
+        with maybe_stage(profiler, "site artifacts"):
+            for dest_path, summary in summaries.items():
+                artifacts.add(page_url(dest_path, staging_dir), summary)
+            artifacts.write(staging_dir, args.basepath)
+
+
+def explain(args: argparse.Namespace) -> int:
+    graph = DependencyGraph(load_manifest(args.manifest))
+    reasons = graph.explain(args.explain)
+    if reasons is None:
+        print(f"{args.explain} is not in {args.manifest}, run an incremental build")
+        return 1
+    entry = graph.outputs[os.path.normpath(args.explain)]
+    print(f"{args.explain} was last rebuilt because:")
+    for reason in reasons:
+        print(f"  {reason}")
+    print("inputs:")
+    for path in entry["inputs"]:
+        print(f"  {path}")
+    return 0
+
+
+def log_level(args: argparse.Namespace) -> int:
+    if args.verbose:
+        return logging.DEBUG
+    if args.quiet:
+        return logging.WARNING
+    return logging.INFO
+
+
+def run(
+    args: argparse.Namespace,
+    cache: RenderCache = None,
+    metadata_cache: MetadataCache = None,
+) -> int:
+    """Runs one invocation of the generator and returns its exit code."""
+    if args.explain:
+        return explain(args)
+    # Resizing clears the memo, which a warm daemon process wants to keep
+    if inline_cache_info().maxsize != args.inline_cache_size:
+        set_inline_cache_size(args.inline_cache_size)
+    if args.local_shards:
+        failed = run_local_shards(args.argv, args.local_shards)
+        if failed:
+            logger.error("%d of %d shards failed", len(failed), args.local_shards)
+            return 1
+    profiler = Profiler() if args.profile or args.trace else None
+    with maybe_stage(profiler, "build"):
+        build(args, profiler, cache, metadata_cache)
+    if profiler is not None:
+        print(profiler.report())
+        if args.trace:
+            profiler.write_trace(args.trace)
+    return 0
 
 
 def main():
-    print(sys.argv)
-    if len(sys.argv) == 1:
-        basepath = "/"
-    elif len(sys.argv) != 1:
-        basepath = sys.argv[1]
-    if os.path.exists("./docs"):
-        shutil.rmtree("./docs")
-    copy_files_recursive("./static", "./docs")
-    generate_pages_recursive("./content/", "./template.html", "./docs/", basepath)
+    args = parse_args(sys.argv[1:])
+    logging.basicConfig(level=log_level(args), format="%(message)s")
+    logger.debug("arguments: %s", sys.argv)
+    sys.exit(run(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path: str) -> str:
+    """Returns the sha256 hex digest of a file's contents."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """Loads the output entries of a manifest, or an empty dict if there is none."""
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    # Manifests written by another version can't be trusted, so rebuild everything
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("outputs", {})
+
+
+def save_manifest(manifest_path: str, outputs: dict):
+    manifest = {"version": MANIFEST_VERSION, "outputs": outputs}
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
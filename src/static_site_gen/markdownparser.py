@@ -1,10 +1,29 @@
 import re
 from enum import Enum
+from functools import lru_cache
 
 from static_site_gen.htmlnode import ParentNode
+from static_site_gen import textnode
+from static_site_gen.profiling import Profiler, maybe_stage
 from static_site_gen.textnode import TextNode, TextType, text_node_to_html_node
 
 
+# Bump whenever the html produced for the same markdown changes, this keys the render cache
+PARSER_VERSION = "2"
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+INLINE_CACHE_SIZE = 4096
+
+MARKDOWN_IMAGES_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+MARKDOWN_LINKS_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+HEADING_PATTERN = re.compile(r"#{1,6}\ \w")
+TITLE_PATTERN = re.compile(r"^#\s+(.*)$")
+# A newline followed by a line that doesn't continue the quote or unordered list
+QUOTE_BREAK_PATTERN = re.compile(r"\n(?!>)")
+UO_LIST_BREAK_PATTERN = re.compile(r"\n(?!- |\* )")
+
+
 class MarkdownBlockType(Enum):
     HEADING = "heading"
     PARAGRAPH = "paragraph"
@@ -37,14 +56,12 @@ def split_nodes_delimiter(old_nodes: list, delimiter: str, text_type: TextType)
 
 
 def extract_markdown_images(text: str) -> list:
-    markdown_images_pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    images = re.findall(markdown_images_pattern, text)
+    images = MARKDOWN_IMAGES_PATTERN.findall(text)
     return images
 
 
 def extract_markdown_links(text: str) -> list:
-    markdown_links_pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    links = re.findall(markdown_links_pattern, text)
+    links = MARKDOWN_LINKS_PATTERN.findall(text)
     return links
 
 
@@ -104,7 +121,67 @@ def split_element(text: str, element: tuple, nodes: list, element_type: TextType
     return text
 
 
-def text_to_textnodes(inline_markdown: str) -> list:
+INLINE_ELEMENT_PATTERN = re.compile(
+    r"!\[(?P<alt>[^\[\]]*)\]\((?P<src>[^\(\)]*)\)"
+    r"|(?<!!)\[(?P<text>[^\[\]]*)\]\((?P<href>[^\(\)]*)\)"
+)
+INLINE_DELIMITER_PATTERN = re.compile(r"\*\*|_|`")
+INLINE_DELIMITER_TYPES = {
+    "**": TextType.MD_BOLD,
+    "_": TextType.MD_ITALIC,
+    "`": TextType.MD_CODE,
+}
+
+
+def text_to_textnodes(inline_markdown: str, legacy: bool = False) -> list:
+    """Tokenizes inline markdown into text nodes in a single left to right pass.
+
+    Images and links are found first, as in the legacy pipeline, and delimiters are
+    only paired within the text between them. Pass legacy=True to run the old
+    split_nodes_* pipeline instead, e.g. to compare the output of the two.
+    """
+    if legacy:
+        return text_to_textnodes_legacy(inline_markdown)
+    textnodes = []
+    position = 0
+    for element in INLINE_ELEMENT_PATTERN.finditer(inline_markdown):
+        tokenize_delimiters(inline_markdown, position, element.start(), textnodes)
+        if element.group("alt") is not None:
+            textnodes.append(
+                TextNode(element.group("alt"), TextType.MD_IMAGE, element.group("src"))
+            )
+        else:
+            textnodes.append(
+                TextNode(element.group("text"), TextType.MD_LINK, element.group("href"))
+            )
+        position = element.end()
+    tokenize_delimiters(inline_markdown, position, len(inline_markdown), textnodes)
+    return textnodes
+
+
+def tokenize_delimiters(text: str, start: int, end: int, nodes: list):
+    """Appends the bold, italic, code and plain text nodes found in text[start:end]."""
+    position = start
+    while True:
+        opening = INLINE_DELIMITER_PATTERN.search(text, position, end)
+        if opening is None:
+            break
+        delimiter = opening.group()
+        closing = text.find(delimiter, opening.end(), end)
+        # Delimiter needs to have matching pair to be valid markdown
+        if closing == -1:
+            raise SyntaxError("Invalid markdown syntax")
+        if opening.start() > position:
+            nodes.append(TextNode(text[position : opening.start()], TextType.MD_TEXT))
+        nodes.append(
+            TextNode(text[opening.end() : closing], INLINE_DELIMITER_TYPES[delimiter])
+        )
+        position = closing + len(delimiter)
+    if end > position:
+        nodes.append(TextNode(text[position:end], TextType.MD_TEXT))
+
+
+def text_to_textnodes_legacy(inline_markdown: str) -> list:
     origin_node = TextNode(inline_markdown, TextType.MD_TEXT)
     textnodes = [origin_node]
     textnodes = split_nodes_links(textnodes)
@@ -127,6 +204,35 @@ def markdown_to_blocks(markdown_document: str) -> list:
 
 
 def block_to_block_type(markdown_block: str) -> MarkdownBlockType:
+    """Types a block from its first character, scanning the lines for at most one type.
+
+    Gives the same result as checking is_heading, is_code, is_quote,
+    is_unordered_list and is_ordered_list in turn, see block_to_block_type_chain.
+    """
+    if len(markdown_block) == 0:
+        return MarkdownBlockType.PARAGRAPH
+    match markdown_block[0]:
+        case "#":
+            if HEADING_PATTERN.match(markdown_block):
+                return MarkdownBlockType.HEADING
+        case "`":
+            if is_code(markdown_block):
+                return MarkdownBlockType.CODE
+        case ">":
+            if QUOTE_BREAK_PATTERN.search(markdown_block) is None:
+                return MarkdownBlockType.QUOTE
+        case "-" | "*":
+            if markdown_block[1:2] == " " and (
+                UO_LIST_BREAK_PATTERN.search(markdown_block) is None
+            ):
+                return MarkdownBlockType.UO_LIST
+        case "1":
+            if is_ordered_list(markdown_block):
+                return MarkdownBlockType.O_LIST
+    return MarkdownBlockType.PARAGRAPH
+
+
+def block_to_block_type_chain(markdown_block: str) -> MarkdownBlockType:
     block_type = MarkdownBlockType.PARAGRAPH
     if is_heading(markdown_block):
         block_type = MarkdownBlockType.HEADING
@@ -142,8 +248,7 @@ def block_to_block_type(markdown_block: str) -> MarkdownBlockType:
 
 
 def is_heading(markdown_block: str) -> bool:
-    heading_pattern = r"^#{1,6}\ \w"
-    if re.search(heading_pattern, markdown_block) is None:
+    if HEADING_PATTERN.match(markdown_block) is None:
         return False
     return True
 
@@ -175,12 +280,45 @@ def is_ordered_list(markdown_block: str) -> bool:
 
 
 def text_to_children(text):
+    # Each parent gets its own list, the leaf nodes in it are shared through the memo
+    return list(_inline_children(text))
+
+
+def _text_to_children(text) -> tuple:
     text_nodes = text_to_textnodes(text)
     children = []
     for text_node in text_nodes:
         html_node = text_node_to_html_node(text_node)
         children.append(html_node)
-    return children
+    return tuple(children)
+
+
+# Navigation lists, disclaimers and repeated headings parse to the same nodes every
+# time, so rendered inline fragments are memoized in a bounded LRU
+_inline_children = lru_cache(maxsize=INLINE_CACHE_SIZE)(_text_to_children)
+
+
+def inline_cache_info():
+    """Returns the hits, misses, maxsize and currsize of the inline fragment memo."""
+    return _inline_children.cache_info()
+
+
+def set_inline_cache_size(maxsize: int):
+    """Resizes the inline fragment memo, which also clears it. 0 disables it."""
+    global _inline_children
+    _inline_children = lru_cache(maxsize=maxsize)(_text_to_children)
+
+
+def set_image_table(table: dict):
+    """Sets the processed images that img tags describe.
+
+    The inline fragment memo holds img nodes built from the previous table, so
+    it is cleared when the table changes.
+    """
+    if table == textnode.image_table():
+        return
+    textnode.set_image_table(table)
+    _inline_children.cache_clear()
 
 
 def convert_block_to_paragraph(markdown_block: str) -> ParentNode:
@@ -195,7 +333,7 @@ def convert_block_to_heading(markdown_block: str) -> ParentNode:
     markdown_block = markdown_block.lstrip("# ")
 
     node_children = text_to_children(markdown_block)
-    heading_node = ParentNode(f"h{heading_level}", children=node_children)
+    heading_node = ParentNode(HEADING_TAGS[heading_level - 1], children=node_children)
     return heading_node
 
 
@@ -247,43 +385,181 @@ def convert_block_to_list(markdown_block: str, ordered: bool = False) -> ParentN
     return list_node
 
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
-    document_node = ParentNode("div", children=[])
-    markdown_blocks = markdown_to_blocks(markdown)
-    for markdown_block in markdown_blocks:
-        block_type = block_to_block_type(markdown_block)
-        match block_type:
-            case MarkdownBlockType.PARAGRAPH:
-                document_node.children.append(
-                    convert_block_to_paragraph(markdown_block)
-                )
-            case MarkdownBlockType.HEADING:
-                document_node.children.append(convert_block_to_heading(markdown_block))
-            case MarkdownBlockType.CODE:
-                document_node.children.append(convert_block_to_code(markdown_block))
-            case MarkdownBlockType.QUOTE:
-                document_node.children.append(convert_block_to_quote(markdown_block))
-            case MarkdownBlockType.UO_LIST:
-                document_node.children.append(convert_block_to_list(markdown_block))
-            case MarkdownBlockType.O_LIST:
-                document_node.children.append(
-                    convert_block_to_list(markdown_block, ordered=True)
+def block_to_html_node(
+    markdown_block: str, block_type: MarkdownBlockType
+) -> ParentNode:
+    match block_type:
+        case MarkdownBlockType.HEADING:
+            return convert_block_to_heading(markdown_block)
+        case MarkdownBlockType.CODE:
+            return convert_block_to_code(markdown_block)
+        case MarkdownBlockType.QUOTE:
+            return convert_block_to_quote(markdown_block)
+        case MarkdownBlockType.UO_LIST:
+            return convert_block_to_list(markdown_block)
+        case MarkdownBlockType.O_LIST:
+            return convert_block_to_list(markdown_block, ordered=True)
+    return convert_block_to_paragraph(markdown_block)
+
+
+def iter_markdown_blocks(lines):
+    """Yields (block type, block) pairs from an iterable of lines, e.g. an open file.
+
+    Blocks are separated by empty lines like in markdown_to_blocks, except inside
+    fenced code blocks, which run until the closing fence and may contain blank lines.
+    Only the current block is held in memory.
+    """
+    for markdown_block, fenced in iter_raw_blocks(lines):
+        if fenced:
+            yield MarkdownBlockType.CODE, markdown_block
+        else:
+            yield block_to_block_type(markdown_block), markdown_block
+
+
+def iter_raw_blocks(lines):
+    """Yields (block, fenced) pairs, where fenced marks a complete fenced code block."""
+    block_lines = []
+    in_fence = False
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if in_fence:
+            block_lines.append(line)
+            if line.rstrip().endswith("```"):
+                yield "\n".join(block_lines).strip(), True
+                block_lines = []
+                in_fence = False
+            continue
+        if len(line) == 0:
+            if block_lines:
+                yield from _finish_block(block_lines)
+                block_lines = []
+            continue
+        block_lines.append(line)
+        if len(block_lines) == 1 and line.lstrip().startswith("```"):
+            fence = line.strip()
+            # A fence that closes on its own line is a complete code block
+            if len(fence) >= 6 and fence.endswith("```"):
+                yield fence, True
+                block_lines = []
+            else:
+                in_fence = True
+    if block_lines:
+        yield from _finish_block(block_lines)
+
+
+def _finish_block(block_lines: list):
+    markdown_block = "\n".join(block_lines).strip()
+    if len(markdown_block) != 0:
+        yield markdown_block, False
+
+
+class ParseResult:
+    """A parsed document: its node tree and the metadata collected during the parse."""
+
+    __slots__ = ("node", "title", "headings")
+
+    def __init__(self, node: ParentNode, title: str = None, headings: list = None):
+        self.node = node
+        self.title = title
+        # (level, markdown text) of every heading, in document order
+        self.headings = headings if headings is not None else []
+
+    def require_title(self) -> str:
+        if self.title is None:
+            raise Exception("Document is missing h1 header.")
+        return self.title
+
+    def __repr__(self):
+        return f"ParseResult({self.title=}, {self.headings=}, {self.node=})"
+
+
+def parse_markdown(lines, profiler: Profiler = None, page: str = None) -> ParseResult:
+    """Parses a document and picks up its title and headings in the same pass.
+
+    The title is the first heading 1 line, the same one extract_title finds.
+    With a profiler, the block split, block typing and inline parse run one
+    after another over the whole document, each timed as a stage of the page.
+    """
+    result = ParseResult(ParentNode("div", children=[]))
+
+    def scan_for_title(lines):
+        for line in lines:
+            if result.title is None:
+                result.title = match_title(line)
+            yield line
+
+    if profiler is None:
+        typed_blocks = iter_markdown_blocks(scan_for_title(lines))
+    else:
+        with profiler.stage("block split", page):
+            raw_blocks = list(iter_raw_blocks(scan_for_title(lines)))
+        with profiler.stage("block typing", page):
+            typed_blocks = [
+                (
+                    MarkdownBlockType.CODE if fenced else block_to_block_type(block),
+                    block,
                 )
-    return document_node
+                for block, fenced in raw_blocks
+            ]
+    with maybe_stage(profiler, "inline parse", page):
+        for block_type, markdown_block in typed_blocks:
+            if block_type == MarkdownBlockType.HEADING:
+                heading_level = markdown_block.count("#", 0, 5)
+                result.headings.append((heading_level, markdown_block.lstrip("# ")))
+            result.node.children.append(block_to_html_node(markdown_block, block_type))
+    return result
 
 
-def extract_title(markdown: str) -> str:
-    markdown = markdown.strip()
-    markdown_lines = markdown.split("\n")
-    heading_pattern = r"^#\s+(.*)$"
-    for line in markdown_lines:
-        heading = re.findall(heading_pattern, line)
-        if len(heading) != 0:
-            break
+def markdown_lines_to_html_node(lines) -> ParentNode:
+    return parse_markdown(lines).node
+
+
+def markdown_to_html_node(markdown: str) -> ParentNode:
+    return markdown_lines_to_html_node(markdown.split("\n"))
+
+
+def iter_markdown_html(lines, basepath: str = "/", texts: list = None):
+    """Streams a document's html block by block without keeping its node tree.
+
+    When a texts list is given, each block's plain text is appended to it.
+    """
+    yield "<div>"
+    for block_type, markdown_block in iter_markdown_blocks(lines):
+        node = block_to_html_node(markdown_block, block_type)
+        yield from node.iter_html(basepath)
+        if texts is not None:
+            texts.extend(node.iter_text())
+    yield "</div>"
+
+
+def match_title(line: str) -> str:
+    """Returns the heading 1 text of a line, or None if it isn't a heading 1."""
+    # Cheap check first, most lines don't start a heading at all
+    if not line.startswith("#"):
+        return None
+    heading = TITLE_PATTERN.findall(line)
     if len(heading) == 0:
-        raise Exception("Document is missing h1 header.")
-    # extract the first heading 1 from document, we expect there are no more than 1
+        return None
     heading = heading[0]
     heading = heading.lstrip("# ")
     heading = heading.strip()
     return heading
+
+
+def extract_title(markdown: str) -> str:
+    return extract_title_from_lines(markdown.strip().split("\n"))
+
+
+def extract_title_from_lines(lines) -> str:
+    """Returns the first heading 1, reading only as many lines as it takes to find it.
+
+    This is the title-only fast path: pass an open file and the rest of the
+    document is never read.
+    """
+    for line in lines:
+        heading = match_title(line)
+        if heading is not None:
+            # extract the first heading 1 from document, we expect there are no more than 1
+            return heading
+    raise Exception("Document is missing h1 header.")
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """Records wall and cpu time per build stage and per page.
+
+    Profilers filled in worker processes are sent back with to_dict() and folded
+    into the build's profiler with merge().
+    """
+
+    def __init__(self):
+        # name -> [wall seconds, cpu seconds, calls]
+        self.stages = {}
+        # page -> [wall seconds, cpu seconds]
+        self.pages = {}
+        # name -> count, e.g. cache hits
+        self.counters = {}
+        self.events = []
+
+    @contextmanager
+    def stage(self, name: str, page: str = None):
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.thread_time_ns()
+        try:
+            yield
+        finally:
+            wall = (time.perf_counter_ns() - wall_start) / 1e9
+            cpu = (time.thread_time_ns() - cpu_start) / 1e9
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += 1
+            if page is not None:
+                page_totals = self.pages.setdefault(page, [0.0, 0.0])
+                page_totals[0] += wall
+                page_totals[1] += cpu
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": wall_start // 1000,
+                    "dur": int(wall * 1e6),
+                    "pid": os.getpid(),
+                    "tid": 0,
+                    "args": {"page": page} if page is not None else {},
+                }
+            )
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": self.stages,
+            "pages": self.pages,
+            "counters": self.counters,
+            "events": self.events,
+        }
+
+    def merge(self, data: dict):
+        for name, (wall, cpu, calls) in data["stages"].items():
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += calls
+        for page, (wall, cpu) in data["pages"].items():
+            page_totals = self.pages.setdefault(page, [0.0, 0.0])
+            page_totals[0] += wall
+            page_totals[1] += cpu
+        for name, amount in data["counters"].items():
+            self.count(name, amount)
+        self.events.extend(data["events"])
+
+    def report(self, top: int = 10) -> str:
+        lines = [f"{'stage':<20}{'wall (s)':>10}{'cpu (s)':>10}{'calls':>8}"]
+        by_wall = sorted(self.stages.items(), key=lambda item: -item[1][0])
+        for name, (wall, cpu, calls) in by_wall:
+            lines.append(f"{name:<20}{wall:>10.4f}{cpu:>10.4f}{calls:>8}")
+        if self.counters:
+            lines.append("")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"{name:<28}{amount:>10}")
+        lines.append("")
+        lines.append(f"slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+        by_wall = sorted(self.pages.items(), key=lambda item: -item[1][0])
+        for page, (wall, cpu) in by_wall[:top]:
+            lines.append(
+                f"{wall * 1000:>10.2f}ms wall {cpu * 1000:>10.2f}ms cpu  {page}"
+            )
+        return "\n".join(lines)
+
+    def write_trace(self, trace_path: str):
+        """Writes the events in the Chrome trace format, e.g. for Perfetto."""
+        with open(trace_path, "w") as trace_file:
+            json.dump({"traceEvents": self.events}, trace_file)
+
+
+def maybe_stage(profiler: Profiler, name: str, page: str = None):
+    """Times the stage when there is a profiler, otherwise does nothing."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, page)
@@ -0,0 +1,109 @@
+import filecmp
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def files_identical(path: str, other_path: str) -> bool:
+    """Compares sizes first and only reads both files when the sizes match."""
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+    except FileNotFoundError:
+        return False
+    return filecmp.cmp(path, other_path, shallow=False)
+
+
+@contextmanager
+def write_if_changed(dest_path: str, mode: str = "w"):
+    """Opens a temporary file that replaces dest_path on close, unless the bytes are the same.
+
+    An identical output is left alone and keeps its mtime, so rsync and CDN
+    uploads skip it. A changed one is swapped in with a rename, so readers never
+    see a half-written file.
+    """
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as tmp_file:
+            yield tmp_file
+        if files_identical(tmp_path, dest_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def staging_dir_for(dest_dir_path: str) -> str:
+    return os.path.normpath(dest_dir_path) + ".staging"
+
+
+def prepare_staging(dest_dir_path: str) -> str:
+    """Returns an empty staging directory next to the destination, for a full build."""
+    staging_dir = staging_dir_for(dest_dir_path)
+    if os.path.exists(staging_dir):
+        # Left behind by a build that failed or was interrupted
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+def keep_unchanged_mtimes(staging_dir: str, dest_dir_path: str) -> tuple:
+    """Gives staged files that match the published ones their published mtime.
+
+    A staged file with the published file's size and mtime, a static file copied
+    or linked from the same source, counts as unchanged without reading it; only
+    the others are compared byte for byte. Returns the number of unchanged and
+    changed files.
+    """
+    unchanged = 0
+    changed = 0
+    for dirpath, _, filenames in os.walk(staging_dir):
+        relative_dir = os.path.relpath(dirpath, staging_dir)
+        for filename in filenames:
+            staged_path = os.path.join(dirpath, filename)
+            dest_path = os.path.join(dest_dir_path, relative_dir, filename)
+            try:
+                staged_stat = os.stat(staged_path)
+                dest_stat = os.stat(dest_path)
+            except FileNotFoundError:
+                changed += 1
+                continue
+            if staged_stat.st_size != dest_stat.st_size:
+                changed += 1
+            elif staged_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+                unchanged += 1
+            elif filecmp.cmp(staged_path, dest_path, shallow=False):
+                os.utime(staged_path, ns=(dest_stat.st_atime_ns, dest_stat.st_mtime_ns))
+                unchanged += 1
+            else:
+                changed += 1
+    return unchanged, changed
+
+
+def publish_staging(staging_dir: str, dest_dir_path: str):
+    """Swaps a finished staging directory in for the published one.
+
+    The destination is only missing for the moment between two renames, never
+    for the whole build, and it is never half written.
+    """
+    dest_dir_path = os.path.normpath(dest_dir_path)
+    unchanged, changed = keep_unchanged_mtimes(staging_dir, dest_dir_path)
+    old_dir = dest_dir_path + ".old"
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.exists(dest_dir_path):
+        os.rename(dest_dir_path, old_dir)
+    os.rename(staging_dir, dest_dir_path)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    logger.info(
+        "published %s: %d files changed, %d unchanged",
+        dest_dir_path,
+        changed,
+        unchanged,
+    )
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from static_site_gen.markdownparser import PARSER_VERSION, extract_markdown_images
+from static_site_gen.textnode import image_table, image_table_digest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class RenderCache:
+    """On-disk cache of rendered html fragments, titles and search terms, keyed by content hash.
+
+    Keys cover the markdown, the parser version and the basepath, so the cache
+    directory can be shared between branches and persisted across CI runs. Reads
+    refresh an entry's mtime, which evict() uses to drop the least recently used
+    entries once the cache is over max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, markdown: str, basepath: str) -> str:
+        sha = hashlib.sha256()
+        sha.update(f"{PARSER_VERSION}\0{basepath}\0".encode("utf-8"))
+        # img tags carry the sizes and variants of the page's processed images
+        if image_table():
+            urls = [url for _, url in extract_markdown_images(markdown)]
+            images = image_table_digest(urls)
+            if images:
+                sha.update(f"{images}\0".encode("utf-8"))
+        sha.update(markdown.encode("utf-8"))
+        return sha.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key[2:]}.json")
+
+    def get(self, key: str) -> tuple:
+        """Returns the cached (title, html, terms), or None on a miss."""
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, "r") as entry_file:
+                entry = json.load(entry_file)
+            os.utime(entry_path)
+            return entry["title"], entry["html"], entry["terms"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, title: str, html: str, terms: list):
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Pool workers may store the same page at once, so write then rename
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as entry_file:
+            json.dump({"title": title, "html": html, "terms": terms}, entry_file)
+        os.replace(tmp_path, entry_path)
+
+    def evict(self) -> int:
+        """Deletes the least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                entry_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(entry_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+                total += stat.st_size
+        removed = 0
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("evicted %d render cache entries", removed)
+        return removed
+
+    def __repr__(self):
+        return f"RenderCache({self.cache_dir=}, {self.max_bytes=})"
+
+
+def entry_size(title: str, html: str, terms: list) -> int:
+    return len(title) + len(html) + sum(len(term) for term in terms)
+
+
+class MemoryRenderCache(RenderCache):
+    """Keeps rendered fragments in process memory, for the long-running build daemon.
+
+    Same keys and interface as RenderCache. It is not shared with worker processes,
+    so it only helps builds that render in the process holding it.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_SIZE):
+        super().__init__(None, max_bytes)
+        # key -> (title, html, terms), least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key: str) -> tuple:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, title: str, html: str, terms: list):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = (title, html, terms)
+        self.size += entry_size(title, html, terms)
+
+    def evict(self) -> int:
+        removed = 0
+        while self.size > self.max_bytes and self.entries:
+            self.size -= entry_size(*self.entries.popitem(last=False)[1])
+            removed += 1
+        if removed:
+            logger.info("evicted %d in-memory render cache entries", removed)
+        return removed
+
+    def __repr__(self):
+        return f"MemoryRenderCache({len(self.entries)} entries, {self.max_bytes=})"
@@ -0,0 +1,144 @@
+import fnmatch
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Editor swap, backup and lock files, which are never part of the site
+DEFAULT_EXCLUDE = ("*.swp", "*.swo", "*.swx", "*~", ".#*", "#*#", ".DS_Store")
+PAGE_INCLUDE = ("*.md",)
+
+
+# Directory -> (mtime ns, entries); only long-running processes turn this on
+_listing_cache = None
+
+
+def set_listing_cache(enabled: bool):
+    """Turns the directory listing memo on or off, which also clears it."""
+    global _listing_cache
+    _listing_cache = {} if enabled else None
+
+
+def list_directory(dir_path: str) -> list:
+    """Returns the sorted (name, is_dir, stat) entries of a directory; stat is None for directories.
+
+    os.scandir gives each entry's type without a stat call, and a file's stat is
+    taken once through its DirEntry, for the sync and metadata checks to reuse.
+    With the listing memo on, the names are only listed again once the directory
+    mtime changes; files are still stat'ed on every call, because editing a file
+    in place doesn't touch its directory.
+    """
+    if _listing_cache is not None:
+        # Stat before listing, so a change made in between shows up next time
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        cached = _listing_cache.get(dir_path)
+        if cached is not None and cached[0] == mtime_ns:
+            return [
+                (
+                    name,
+                    is_dir,
+                    None if is_dir else os.stat(os.path.join(dir_path, name)),
+                )
+                for name, is_dir in cached[1]
+            ]
+    with os.scandir(dir_path) as scan:
+        entries = sorted(
+            (entry.name, entry.is_dir(), None if entry.is_dir() else entry.stat())
+            for entry in scan
+        )
+    if _listing_cache is not None:
+        _listing_cache[dir_path] = (
+            mtime_ns,
+            [(name, is_dir) for name, is_dir, _ in entries],
+        )
+    return entries
+
+
+def matches(relative_path: str, patterns: tuple) -> bool:
+    """Matches a slash separated path against globs; a glob without a slash matches the name."""
+    name = relative_path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if fnmatch.fnmatch(relative_path if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def scan_tree(
+    root_path: str, include: tuple = ("*",), exclude: tuple = DEFAULT_EXCLUDE
+) -> list:
+    """Walks a directory in one pass and returns (path, relative path, stat) for its files.
+
+    Files come in name order, depth first. Excluded directories are not entered.
+    Globs match the path relative to root_path, with forward slashes.
+    """
+    files = []
+    skipped = 0
+
+    def walk(dir_path: str, relative_dir: str):
+        nonlocal skipped
+        for name, is_dir, stat in list_directory(dir_path):
+            relative_path = f"{relative_dir}{name}"
+            if matches(relative_path, exclude):
+                skipped += 1
+                continue
+            path = os.path.join(dir_path, name)
+            if is_dir:
+                walk(path, relative_path + "/")
+            elif matches(relative_path, include):
+                files.append((path, relative_path, stat))
+            else:
+                skipped += 1
+
+    walk(root_path, "")
+    if skipped:
+        logger.debug("skipped %d entries under %s", skipped, root_path)
+    return files
+
+
+def page_dest_path(relative_path: str, dest_dir_path: str) -> str:
+    """Where a content page renders to: its relative path with an .html extension."""
+    stem = os.path.splitext(relative_path)[0]
+    return os.path.join(dest_dir_path, *f"{stem}.html".split("/"))
+
+
+class SiteScan:
+    """The flat job lists of one build: (source, destination) pairs for pages and assets.
+
+    stats maps every normalized source path to the stat result taken during the
+    scan, so later stages don't stat the same files again.
+    """
+
+    def __init__(self, pages: list, assets: list, stats: dict):
+        self.pages = pages
+        self.assets = assets
+        self.stats = stats
+
+    def __repr__(self):
+        return f"SiteScan({len(self.pages)} pages, {len(self.assets)} assets)"
+
+
+def scan_site(
+    content_dir_path: str,
+    static_dir_path: str,
+    dest_dir_path: str,
+    include: tuple = PAGE_INCLUDE,
+    exclude: tuple = DEFAULT_EXCLUDE,
+) -> SiteScan:
+    """Scans the content and static directories for one build.
+
+    Content files matching include become pages; static files are assets unless
+    excluded. Either directory may be None or missing.
+    """
+    pages = []
+    assets = []
+    stats = {}
+    if content_dir_path is not None and os.path.isdir(content_dir_path):
+        for path, relative_path, stat in scan_tree(content_dir_path, include, exclude):
+            pages.append((path, page_dest_path(relative_path, dest_dir_path)))
+            stats[os.path.normpath(path)] = stat
+    if static_dir_path is not None and os.path.isdir(static_dir_path):
+        for path, relative_path, stat in scan_tree(static_dir_path, exclude=exclude):
+            dest_path = os.path.join(dest_dir_path, *relative_path.split("/"))
+            assets.append((os.path.normpath(path), os.path.normpath(dest_path)))
+            stats[os.path.normpath(path)] = stat
+    return SiteScan(pages, assets, stats)
@@ -0,0 +1,334 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from static_site_gen.dependencies import DependencyGraph, rebuild_reasons
+from static_site_gen.file_handler import (
+    generate_pages_incremental,
+    remove_output,
+    render_page,
+    sync_file,
+    sync_files,
+)
+from static_site_gen.manifest import load_manifest, save_manifest
+from static_site_gen.scanner import (
+    DEFAULT_EXCLUDE,
+    PAGE_INCLUDE,
+    matches,
+    page_dest_path,
+)
+from static_site_gen.template import load_template
+
+logger = logging.getLogger(__name__)
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+def snapshot(paths: list) -> dict:
+    """Maps every file under the given files and directories to its mtime and size."""
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.normpath(os.path.join(dirpath, filename))
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_paths(old_snapshot: dict, new_snapshot: dict) -> set:
+    paths = old_snapshot.keys() | new_snapshot.keys()
+    return {path for path in paths if old_snapshot.get(path) != new_snapshot.get(path)}
+
+
+def inject_live_reload(html: str) -> str:
+    closing_body = html.rfind("</body>")
+    if closing_body == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:closing_body] + LIVE_RELOAD_SCRIPT + html[closing_body:]
+
+
+class LiveReload:
+    """Counts rebuilds so that waiting browsers can tell when to reload."""
+
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevServer:
+    """Keeps ./docs up to date with the sources and tells browsers when it changed."""
+
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir: str,
+        basepath: str,
+        manifest_path: str,
+        static_manifest_path: str,
+        debounce: float = 0.05,
+        interval: float = 0.1,
+    ):
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.dest_dir = os.path.normpath(dest_dir)
+        self.basepath = basepath
+        self.manifest_path = manifest_path
+        self.static_manifest_path = static_manifest_path
+        self.debounce = debounce
+        self.interval = interval
+        self.live_reload = LiveReload()
+        self.template = None
+
+    def template_dependencies(self) -> list:
+        if self.template is None:
+            return [self.template_path]
+        return self.template.dependencies
+
+    def watched_paths(self) -> list:
+        return [self.content_dir, self.static_dir, *self.template_dependencies()]
+
+    def build(self):
+        sync_files(self.static_dir, self.dest_dir, self.static_manifest_path)
+        generate_pages_incremental(
+            self.content_dir,
+            self.template_path,
+            self.dest_dir,
+            self.basepath,
+            self.manifest_path,
+            static_dir_path=self.static_dir,
+        )
+        self.template = load_template(self.template_path, self.basepath)
+
+    def rebuild(self, changed: set):
+        """Re-renders only the outputs affected by the changed source paths.
+
+        Template, partial and static file changes go through the dependency graph
+        in the manifest, so only the pages that use them are rendered again.
+        """
+        static_changed = {
+            path for path in changed if path.startswith(self.static_dir + os.sep)
+        }
+        for path in sorted(static_changed):
+            self.sync_static_file(path)
+        graph = DependencyGraph(load_manifest(self.manifest_path))
+        dependents = graph.dependents(static_changed)
+        if changed & set(self.template_dependencies()) or dependents:
+            logger.info("template or referenced static files changed")
+            generate_pages_incremental(
+                self.content_dir,
+                self.template_path,
+                self.dest_dir,
+                self.basepath,
+                self.manifest_path,
+                static_dir_path=self.static_dir,
+            )
+            self.template = load_template(self.template_path, self.basepath)
+            return
+        for path in sorted(changed):
+            if not path.startswith(self.content_dir + os.sep):
+                continue
+            relative_path = os.path.relpath(path, self.content_dir).replace(os.sep, "/")
+            if matches(relative_path, PAGE_INCLUDE) and not matches(
+                relative_path, DEFAULT_EXCLUDE
+            ):
+                self.rebuild_page(path)
+
+    def rebuild_page(self, from_path: str):
+        """Renders or removes one page and updates its entry in the manifest's graph."""
+        relative_path = os.path.relpath(from_path, self.content_dir)
+        dest_path = page_dest_path(relative_path.replace(os.sep, "/"), self.dest_dir)
+        dest_key = os.path.normpath(dest_path)
+        outputs = load_manifest(self.manifest_path)
+        if not os.path.exists(from_path):
+            remove_output(dest_path, self.dest_dir)
+            outputs.pop(dest_key, None)
+            save_manifest(self.manifest_path, outputs)
+            return
+        if self.template is None:
+            self.template = load_template(self.template_path, self.basepath)
+        old_entry = outputs.pop(dest_key, None)
+        entry = DependencyGraph().page_entry(
+            from_path,
+            self.basepath,
+            self.template.dependencies,
+            self.static_dir,
+            old_entry,
+        )
+        reasons = rebuild_reasons(old_entry, entry, os.path.exists(dest_path))
+        entry["reasons"] = reasons or old_entry.get("reasons", [])
+        try:
+            entry["summary"] = render_page(
+                from_path, self.template, dest_path, summarize=True
+            )
+        finally:
+            # A page that failed to render has no entry, so the next build retries it
+            if "summary" in entry:
+                outputs[dest_key] = entry
+            save_manifest(self.manifest_path, outputs)
+
+    def sync_static_file(self, from_path: str):
+        relative_path = os.path.relpath(from_path, self.static_dir)
+        dest_path = os.path.join(self.dest_dir, relative_path)
+        if not os.path.exists(from_path):
+            remove_output(dest_path, self.dest_dir)
+            return
+        logger.debug(" * %s -> %s", from_path, dest_path)
+        sync_file(from_path, dest_path)
+
+    def watch(self, stop_event: threading.Event):
+        """Polls the sources and rebuilds once a burst of saves has settled."""
+        previous = snapshot(self.watched_paths())
+        pending = set()
+        last_change = 0.0
+        while not stop_event.wait(self.interval):
+            current = snapshot(self.watched_paths())
+            changed = changed_paths(previous, current)
+            previous = current
+            if changed:
+                pending |= changed
+                last_change = time.monotonic()
+                continue
+            if pending and time.monotonic() - last_change >= self.debounce:
+                started = time.perf_counter()
+                try:
+                    self.rebuild(pending)
+                except Exception as err:
+                    logger.error("rebuild failed: %s: %s", type(err).__name__, err)
+                else:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    logger.info("rebuilt %d change(s) in %.1fms", len(pending), elapsed)
+                    self.live_reload.notify()
+                pending = set()
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Serves the built site, adding the live reload script to html pages."""
+
+    def __init__(self, live_reload: LiveReload, *args, **kwargs):
+        self.live_reload = live_reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.send_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?")[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "r") as html_file:
+            body = inject_live_reload(html_file.read()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.live_reload.version
+        while True:
+            new_version = self.live_reload.wait(version, timeout=15)
+            try:
+                if new_version != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = new_version
+                else:
+                    # Keep-alive comment so proxies don't drop the idle connection
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build the site, serve ./docs and rebuild it on changes."
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--manifest", default="./.ssg-manifest.json")
+    parser.add_argument("--static-manifest", default="./.ssg-static-manifest.json")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.05,
+        help="seconds to wait for a burst of saves to settle before rebuilding",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log every file processed"
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s"
+    )
+    dev_server = DevServer(
+        "./content",
+        "./static",
+        "./template.html",
+        "./docs",
+        args.basepath,
+        args.manifest,
+        args.static_manifest,
+        debounce=args.debounce,
+    )
+    dev_server.build()
+
+    stop_event = threading.Event()
+    watcher = threading.Thread(target=dev_server.watch, args=(stop_event,))
+    watcher.daemon = True
+    watcher.start()
+
+    handler = partial(LiveReloadHandler, dev_server.live_reload, directory="./docs")
+    with ThreadingHTTPServer((args.bind, args.port), handler) as httpd:
+        logger.info("serving ./docs on http://%s:%d/", args.bind, args.port)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
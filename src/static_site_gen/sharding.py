@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+
+from static_site_gen.file_handler import generate_pages, scan_content, sync_file
+from static_site_gen.profiling import Profiler
+from static_site_gen.render_cache import RenderCache
+from static_site_gen.scanner import DEFAULT_EXCLUDE, PAGE_INCLUDE
+
+logger = logging.getLogger(__name__)
+
+SHARD_MANIFEST_VERSION = 1
+SHARD_MANIFEST_NAME = "manifest.json"
+# Options, with a value, of the parent process that the shard processes must not inherit
+LOCAL_SHARD_OPTIONS = ("--local-shards", "--trace")
+
+
+def parse_shard(text: str) -> tuple:
+    """Parses an I/N shard spec into (index, count), with 0 <= index < count."""
+    index, separator, count = text.partition("/")
+    try:
+        index = int(index)
+        count = int(count)
+    except ValueError:
+        index = count = 0
+    if not separator or count < 1 or not 0 <= index < count:
+        raise ValueError(f"{text} is not a shard I/N with 0 <= I < N")
+    return index, count
+
+
+def shard_of(relative_source: str, count: int) -> int:
+    """Assigns a page to a shard by a hash of its path under the content directory.
+
+    The path is hashed with forward slashes, so every machine agrees on the
+    split whatever its platform or checkout location.
+    """
+    digest = hashlib.sha256(relative_source.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def relative_posix_path(path: str, root: str) -> str:
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def select_shard(
+    page_jobs: list, content_dir_path: str, index: int, count: int
+) -> list:
+    """Returns the (source, destination) page jobs that belong to one shard."""
+    return [
+        (from_path, dest_path)
+        for from_path, dest_path in page_jobs
+        if shard_of(relative_posix_path(from_path, content_dir_path), count) == index
+    ]
+
+
+def shard_path(shard_dir_path: str, index: int, count: int) -> str:
+    return os.path.join(shard_dir_path, f"{index}-of-{count}")
+
+
+def build_shard(
+    dir_path_content: str,
+    template_path: str,
+    shard_dir_path: str,
+    basepath: str,
+    index: int,
+    count: int,
+    workers: int = 1,
+    profiler: Profiler = None,
+    cache: RenderCache = None,
+    io_concurrency: int = None,
+    include: tuple = PAGE_INCLUDE,
+    exclude: tuple = DEFAULT_EXCLUDE,
+) -> str:
+    """Renders one shard's pages into its own output directory, then writes its manifest.
+
+    The manifest names every rendered page and keeps its summary, the shard's
+    fragment of the sitemap, feed and search index. It is written last, so a
+    shard that failed or is still running has none. Returns the shard's path.
+    """
+    output_path = shard_path(shard_dir_path, index, count)
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    docs_path = os.path.join(output_path, "docs")
+    os.makedirs(docs_path)
+    page_jobs = scan_content(dir_path_content, docs_path, include, exclude).pages
+    shard_jobs = select_shard(page_jobs, dir_path_content, index, count)
+    summaries = generate_pages(
+        shard_jobs,
+        template_path,
+        basepath,
+        workers,
+        profiler,
+        cache,
+        io_concurrency,
+        summarize=True,
+    )
+    pages = {
+        relative_posix_path(dest_path, docs_path): {
+            "source": relative_posix_path(from_path, dir_path_content),
+            "summary": summary,
+        }
+        for (from_path, dest_path), summary in zip(shard_jobs, summaries)
+    }
+    manifest = {
+        "version": SHARD_MANIFEST_VERSION,
+        "shard": index,
+        "count": count,
+        "basepath": basepath,
+        "pages": pages,
+    }
+    manifest_path = os.path.join(output_path, SHARD_MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    logger.info(
+        "shard %d/%d rendered %d of %d pages", index, count, len(pages), len(page_jobs)
+    )
+    return output_path
+
+
+def load_shard_manifest(
+    shard_dir_path: str, index: int, count: int, basepath: str
+) -> dict:
+    manifest_path = os.path.join(
+        shard_path(shard_dir_path, index, count), SHARD_MANIFEST_NAME
+    )
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        raise Exception(
+            f"Shard {index}/{count} has not finished, {manifest_path} is missing."
+        ) from None
+    if manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise Exception(f"{manifest_path} was written by another version, rebuild it.")
+    if manifest["basepath"] != basepath:
+        raise Exception(
+            f"Shard {index}/{count} was built for basepath {manifest['basepath']}, "
+            f"not {basepath}."
+        )
+    return manifest
+
+
+def merge_shards(
+    shard_dir_path: str,
+    count: int,
+    basepath: str,
+    page_jobs: list,
+    dest_dir_path: str,
+) -> dict:
+    """Collects the outputs of every shard into the destination directory.
+
+    page_jobs are the pages of the current content, with destinations in
+    dest_dir_path; a page no shard rendered fails the merge, so an incomplete
+    site is never published. Shard outputs are hard-linked where possible.
+    Returns the page summaries by destination path.
+    """
+    expected = {
+        relative_posix_path(dest_path, dest_dir_path) for _, dest_path in page_jobs
+    }
+    summaries = {}
+    for index in range(count):
+        manifest = load_shard_manifest(shard_dir_path, index, count, basepath)
+        docs_path = os.path.join(shard_path(shard_dir_path, index, count), "docs")
+        for relative_dest, page in sorted(manifest["pages"].items()):
+            if relative_dest not in expected:
+                logger.warning(
+                    "skipping %s from shard %d/%d, its source is gone",
+                    relative_dest,
+                    index,
+                    count,
+                )
+                continue
+            dest_path = os.path.join(dest_dir_path, *relative_dest.split("/"))
+            if dest_path in summaries:
+                raise Exception(f"{relative_dest} was rendered by more than one shard.")
+            sync_file(
+                os.path.join(docs_path, *relative_dest.split("/")), dest_path, link=True
+            )
+            summaries[dest_path] = page["summary"]
+    missing = sorted(
+        expected
+        - {relative_posix_path(dest_path, dest_dir_path) for dest_path in summaries}
+    )
+    if missing:
+        raise Exception(
+            f"{len(missing)} page(s) are in no shard output, rebuild the shards: "
+            + ", ".join(missing[:5])
+        )
+    logger.info("merged %d pages from %d shards", len(summaries), count)
+    return summaries
+
+
+def shard_argv(argv: list, index: int, count: int) -> list:
+    """Turns the arguments of a --local-shards run into those of one shard process."""
+    child_argv = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        option = arg.split("=", 1)[0]
+        if option in LOCAL_SHARD_OPTIONS:
+            skip_value = "=" not in arg
+            continue
+        child_argv.append(arg)
+    return child_argv + ["--shard", f"{index}/{count}"]
+
+
+def run_local_shards(argv: list, count: int) -> list:
+    """Builds every shard in its own process, the way separate machines would.
+
+    Returns the indexes of the shards that failed, after logging their output.
+    """
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "static_site_gen.main",
+                *shard_argv(argv, index, count),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        for index in range(count)
+    ]
+    failed = []
+    for index, process in enumerate(processes):
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            logger.error("shard %d/%d failed:\n%s", index, count, output.rstrip())
+            failed.append(index)
+        else:
+            logger.debug("shard %d/%d:\n%s", index, count, output.rstrip())
+    return failed
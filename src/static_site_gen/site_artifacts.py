@@ -0,0 +1,179 @@
+import datetime
+import json
+import logging
+import os
+import re
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from static_site_gen.publish import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+SEARCH_INDEX_VERSION = 1
+SEARCH_PREFIX_LENGTH = 2
+RSS_ITEM_LIMIT = 20
+
+
+def search_terms(texts: list) -> list:
+    """Returns the sorted, unique, lowercase words of a page's text."""
+    terms = set()
+    for text in texts:
+        terms.update(
+            term for term in SEARCH_TERM_PATTERN.findall(text.lower()) if len(term) > 1
+        )
+    return sorted(terms)
+
+
+def page_summary(title: str, metadata: dict, texts: list, terms: list = None) -> dict:
+    """What the sitemap, feed and search index need to know about a rendered page.
+
+    terms are the search_terms() of the texts when they are already known,
+    as they are for pages served from the render cache.
+    """
+    date = metadata.get("date")
+    return {
+        "title": title,
+        "date": None if date is None else str(date),
+        "terms": search_terms(texts) if terms is None else terms,
+    }
+
+
+def parse_date(date: str) -> datetime.datetime:
+    """Parses the YYYY-MM-DD start of a front matter date, or returns None."""
+    if date is None:
+        return None
+    try:
+        day = datetime.date.fromisoformat(date[:10])
+    except ValueError:
+        return None
+    return datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc)
+
+
+class SiteArtifacts:
+    """Collects every rendered page's summary and writes the sitemap, feed and search index.
+
+    The summaries come out of the page render itself, so nothing in the output
+    directory is read back. The search index is an inverted index split into
+    shards by the first prefix_length characters of each term; a browser loads
+    search/index.json and then only the search/shards/ files of the terms it
+    looks up.
+    """
+
+    def __init__(
+        self,
+        site_url: str,
+        feed_title: str = None,
+        sitemap: bool = True,
+        rss: bool = True,
+        search: bool = True,
+        prefix_length: int = SEARCH_PREFIX_LENGTH,
+        rss_limit: int = RSS_ITEM_LIMIT,
+    ):
+        self.site_url = site_url.rstrip("/")
+        self.feed_title = feed_title or self.site_url
+        self.sitemap = sitemap
+        self.rss = rss
+        self.search = search
+        self.prefix_length = prefix_length
+        self.rss_limit = rss_limit
+        # url -> summary
+        self.pages = {}
+
+    def add(self, url: str, summary: dict):
+        self.pages[url] = summary
+
+    def absolute_url(self, url: str, basepath: str) -> str:
+        return self.site_url + basepath.rstrip("/") + url
+
+    def write(self, dest_dir_path: str, basepath: str = "/") -> list:
+        """Writes the enabled artifacts and returns their paths."""
+        paths = []
+        if self.sitemap:
+            paths.append(self.write_sitemap(dest_dir_path, basepath))
+        if self.rss:
+            paths.append(self.write_rss(dest_dir_path, basepath))
+        if self.search:
+            paths.extend(self.write_search_index(dest_dir_path, basepath))
+        logger.info("wrote %d site artifacts for %d pages", len(paths), len(self.pages))
+        return paths
+
+    def write_sitemap(self, dest_dir_path: str, basepath: str) -> str:
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for url, summary in sorted(self.pages.items()):
+            date = parse_date(summary["date"])
+            lastmod = f"<lastmod>{date.date().isoformat()}</lastmod>" if date else ""
+            loc = escape(self.absolute_url(url, basepath))
+            lines.append(f"<url><loc>{loc}</loc>{lastmod}</url>")
+        lines.append("</urlset>")
+        return write_artifact(dest_dir_path, "sitemap.xml", "\n".join(lines) + "\n")
+
+    def write_rss(self, dest_dir_path: str, basepath: str) -> str:
+        """Writes the newest dated pages as an RSS 2.0 feed."""
+        dated = [
+            (parse_date(summary["date"]), url, summary)
+            for url, summary in self.pages.items()
+            if parse_date(summary["date"]) is not None
+        ]
+        dated.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        site_link = escape(self.absolute_url("/", basepath))
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss version="2.0"><channel>',
+            f"<title>{escape(self.feed_title)}</title>",
+            f"<link>{site_link}</link>",
+            f"<description>{escape(self.feed_title)}</description>",
+        ]
+        for date, url, summary in dated[: self.rss_limit]:
+            link = escape(self.absolute_url(url, basepath))
+            lines.append(
+                f"<item><title>{escape(summary['title'])}</title><link>{link}</link>"
+                f"<guid>{link}</guid><pubDate>{format_datetime(date)}</pubDate></item>"
+            )
+        lines.append("</channel></rss>")
+        return write_artifact(dest_dir_path, "feed.xml", "\n".join(lines) + "\n")
+
+    def write_search_index(self, dest_dir_path: str, basepath: str) -> list:
+        """Writes search/index.json with the page table, and one json file per shard."""
+        urls = sorted(self.pages)
+        shards = {}
+        for page_id, url in enumerate(urls):
+            for term in self.pages[url]["terms"]:
+                shard = shards.setdefault(term[: self.prefix_length], {})
+                shard.setdefault(term, []).append(page_id)
+        index = {
+            "version": SEARCH_INDEX_VERSION,
+            "prefix_length": self.prefix_length,
+            "pages": [[basepath + url[1:], self.pages[url]["title"]] for url in urls],
+            "shards": sorted(shards),
+        }
+        search_dir = os.path.join(dest_dir_path, "search")
+        shards_dir = os.path.join(search_dir, "shards")
+        paths = [write_artifact(search_dir, "index.json", compact_json(index))]
+        for prefix, shard in sorted(shards.items()):
+            paths.append(
+                write_artifact(shards_dir, f"{prefix}.json", compact_json(shard))
+            )
+        # Shards of terms that are gone would otherwise linger from earlier builds
+        os.makedirs(shards_dir, exist_ok=True)
+        for filename in os.listdir(shards_dir):
+            path = os.path.join(shards_dir, filename)
+            if path not in paths:
+                os.remove(path)
+        return paths
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), sort_keys=True)
+
+
+def write_artifact(dest_dir_path: str, filename: str, text: str) -> str:
+    os.makedirs(dest_dir_path, exist_ok=True)
+    path = os.path.join(dest_dir_path, filename)
+    with write_if_changed(path) as artifact_file:
+        artifact_file.write(text)
+    return path
@@ -0,0 +1,123 @@
+import os
+import re
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+PARTIAL_PATTERN = re.compile(r"\{\{> ([\w./-]+) \}\}")
+
+
+def rewrite_root_urls(html: str, basepath: str) -> str:
+    """Points root-relative href and src attributes at the basepath."""
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    html = html.replace('src="/', f'src="{basepath}')
+    return html
+
+
+class Template:
+    """A page template split once into static segments and the slots between them.
+
+    The basepath rewrite is applied to the static segments when the template is
+    compiled, so filling it in is a single join.
+    """
+
+    def __init__(self, source: str, basepath: str = "/", dependencies: list = None):
+        source = rewrite_root_urls(source, basepath)
+        pieces = SLOT_PATTERN.split(source)
+        # split() alternates static text and captured slot names
+        self.segments = pieces[0::2]
+        self.slots = pieces[1::2]
+        self.basepath = basepath
+        # The template file and every partial it includes, for the dependency graph
+        self.dependencies = dependencies or []
+
+    def iter_chunks(self, **values):
+        """Yields the filled template; a slot value may be a string or an iterable of chunks.
+
+        Slots without a value are left in the page as they were written.
+        """
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot)
+            if value is None:
+                yield "{{ " + slot + " }}"
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield segment
+
+    def render(self, **values) -> str:
+        return "".join(self.iter_chunks(**values))
+
+    def write_to(self, fp, **values):
+        fp.writelines(self.iter_chunks(**values))
+
+    def __repr__(self):
+        return f"Template({self.slots=}, {self.basepath=})"
+
+
+def read_template_source(template_path: str, including: tuple = ()) -> tuple:
+    """Reads a template with its {{> partial.html }} includes inlined.
+
+    Partial paths are relative to the file that includes them. Returns the source
+    and the paths of the template and every partial it pulled in.
+    """
+    template_path = os.path.normpath(template_path)
+    if template_path in including:
+        chain = " -> ".join(including + (template_path,))
+        raise ValueError(f"Template partials include each other: {chain}")
+    with open(template_path, "r") as template_file:
+        source = template_file.read()
+    dependencies = [template_path]
+    template_dir = os.path.dirname(template_path)
+
+    def include(match: re.Match) -> str:
+        partial_path = os.path.join(template_dir, match.group(1))
+        partial_source, partial_dependencies = read_template_source(
+            partial_path, including + (template_path,)
+        )
+        dependencies.extend(
+            path for path in partial_dependencies if path not in dependencies
+        )
+        return partial_source
+
+    return PARTIAL_PATTERN.sub(include, source), dependencies
+
+
+# Compiled templates by (path, basepath); only long-running processes turn this on
+_template_cache = None
+
+
+def set_template_cache(enabled: bool):
+    """Turns the compiled template memo on or off, which also clears it."""
+    global _template_cache
+    _template_cache = {} if enabled else None
+
+
+def file_stamps(paths: list) -> list:
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stamps.append(None)
+            continue
+        stamps.append((stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+def load_template(template_path: str, basepath: str = "/") -> Template:
+    """Reads and compiles a template, reusing a memoized one while none of its files changed."""
+    if _template_cache is not None:
+        cache_key = (os.path.normpath(template_path), basepath)
+        cached = _template_cache.get(cache_key)
+        if cached is not None:
+            stamps, template = cached
+            if stamps == file_stamps(template.dependencies):
+                return template
+    source, dependencies = read_template_source(template_path)
+    template = Template(source, basepath, dependencies)
+    if _template_cache is not None:
+        _template_cache[cache_key] = (file_stamps(dependencies), template)
+    return template
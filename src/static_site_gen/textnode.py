@@ -1,4 +1,9 @@
+import hashlib
+import json
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
+
 from static_site_gen.htmlnode import LeafNode
 
 
@@ -12,6 +17,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: str, url: str = None):
         self.text = text
         self.text_type = text_type
@@ -30,6 +37,65 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
+# Pages link to the same urls and images over and over, so those nodes share
+# one read-only props mapping instead of each allocating a dict
+@lru_cache(maxsize=4096)
+def link_props(url: str) -> MappingProxyType:
+    return MappingProxyType({"href": url})
+
+
+# Static image url -> {"width", "height", "variants": [[url, width], ...]}, filled
+# in by the image stage of a build; empty means plain img tags
+_image_table = {}
+
+
+def set_image_table(table: dict):
+    """Sets the processed images that img tags describe, which also clears the props memo."""
+    global _image_table
+    _image_table = table
+    image_props.cache_clear()
+
+
+def image_table() -> dict:
+    return _image_table
+
+
+def image_table_digest(urls) -> str:
+    """Identifies the table entries of a page's image urls, for caches of its html.
+
+    Empty when none of the urls is a processed image.
+    """
+    images = {url: _image_table[url] for url in urls if url in _image_table}
+    if not images:
+        return ""
+    return hashlib.sha256(
+        json.dumps(images, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def image_props(url: str, alt: str) -> MappingProxyType:
+    image = _image_table.get(url)
+    if image is None:
+        return MappingProxyType({"src": url, "alt": alt})
+    # The size reserves the image's box before it loads, so the layout doesn't shift
+    props = {
+        "src": url,
+        "alt": alt,
+        "width": str(image["width"]),
+        "height": str(image["height"]),
+    }
+    if image["variants"]:
+        candidates = [
+            f"{variant_url} {width}w" for variant_url, width in image["variants"]
+        ]
+        candidates.append(f"{url} {image['width']}w")
+        props["srcset"] = ", ".join(candidates)
+        props["sizes"] = f"(max-width: {image['width']}px) 100vw, {image['width']}px"
+    props["loading"] = "lazy"
+    return MappingProxyType(props)
+
+
 def text_node_to_html_node(textnode):
     match textnode.text_type:
         case TextType.MD_TEXT:
@@ -42,9 +108,11 @@ def text_node_to_html_node(textnode):
             return LeafNode(tag="code", value=textnode.text)
         case TextType.MD_IMAGE:
             return LeafNode(
-                tag="img", value="", props={"src": textnode.url, "alt": textnode.text}
+                tag="img", value="", props=image_props(textnode.url, textnode.text)
             )
         case TextType.MD_LINK:
-            return LeafNode(tag="a", value=textnode.text, props={"href": textnode.url})
+            return LeafNode(
+                tag="a", value=textnode.text, props=link_props(textnode.url)
+            )
         case _:
             raise ValueError("Unsupported textnode type.")
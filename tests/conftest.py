@@ -0,0 +1,12 @@
+import pytest
+
+from tests.helpers import make_site
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A home page and a blog post."""
+    return make_site(
+        str(tmp_path),
+        {"index.md": "# Home\n\nWelcome", "blog/post/index.md": "# Post\n\nText"},
+    )
@@ -0,0 +1,29 @@
+"""Files and sites for the tests to build."""
+
+import os
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def read_file(path):
+    with open(path) as file:
+        return file.read()
+
+
+def make_site(root, pages, template=TEMPLATE):
+    """Writes pages, by their path under content/, and the template into root.
+
+    Returns the content directory, template and docs directory paths.
+    """
+    content = os.path.join(root, "content")
+    for relative_path, text in pages.items():
+        write_file(os.path.join(content, *relative_path.split("/")), text)
+    template_path = os.path.join(root, "template.html")
+    write_file(template_path, template)
+    return content, template_path, os.path.join(root, "docs")
@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+
+from static_site_gen import scanner, template
+from static_site_gen.daemon import (
+    BuildDaemon,
+    BuildServer,
+    parse_daemon_args,
+    send_request,
+)
+from tests.helpers import make_site, read_file, write_file
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_site(".", {"index.md": "# Home\n\nWelcome", "blog/post.md": "# Post\n\nText"})
+    write_file("static/index.css", "body {}")
+    yield tmp_path
+    template.set_template_cache(False)
+    scanner.set_listing_cache(False)
+
+
+def test_daemon_builds_reuse_warm_caches(site):
+    daemon = BuildDaemon()
+    response = daemon.handle({"command": "build", "argv": ["-q"]})
+    assert response["ok"]
+    assert "<h1>Home</h1>" in read_file("docs/index.html")
+    assert len(daemon.render_cache.entries) == 2
+
+    write_file("content/index.md", "# Home\n\nChanged")
+    response = daemon.handle({"command": "build", "argv": ["-q"]})
+    assert response["ok"]
+    assert "Changed" in read_file("docs/index.html")
+    assert len(daemon.render_cache.entries) == 3
+    assert daemon.status()["builds"] == 2
+
+
+def test_daemon_reports_bad_arguments_and_failures(site):
+    daemon = BuildDaemon()
+    response = daemon.handle({"command": "build", "argv": ["--jobs", "many"]})
+    assert not response["ok"]
+    assert "invalid int value" in response["output"]
+
+    os.remove("template.html")
+    response = daemon.handle({"command": "build", "argv": ["-q"]})
+    assert not response["ok"]
+    assert "template.html" in response["output"]
+
+
+def test_daemon_refuses_other_directories(site):
+    daemon = BuildDaemon()
+    response = daemon.handle({"command": "status", "cwd": "/elsewhere"})
+    assert not response["ok"]
+
+
+def test_daemon_serves_requests_over_socket(site):
+    socket_path = str(site / "daemon.sock")
+    server = BuildServer(socket_path, BuildDaemon())
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        response = send_request(socket_path, {"command": "build", "argv": ["-q"]})
+        assert response["ok"]
+        assert os.path.exists("docs/blog/post.html")
+        status = send_request(socket_path, {"command": "status"})["status"]
+        assert status["builds"] == 1
+        assert send_request(socket_path, {"command": "stop"})["ok"]
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(socket_path)
+
+
+def test_parse_daemon_args_forwards_build_arguments():
+    args, build_argv = parse_daemon_args(["build", "--socket", "s", "-q", "/site/"])
+    assert args.command == "build"
+    assert args.socket == "s"
+    assert build_argv == ["-q", "/site/"]
+    with pytest.raises(SystemExit):
+        parse_daemon_args(["status", "-q"])
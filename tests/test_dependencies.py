@@ -0,0 +1,99 @@
+import os
+
+from static_site_gen.dependencies import (
+    DependencyGraph,
+    find_static_refs,
+    rebuild_reasons,
+)
+from static_site_gen.file_handler import generate_pages_incremental
+from static_site_gen.manifest import load_manifest
+from static_site_gen.markdownparser import set_image_table
+from tests.helpers import make_site, write_file
+
+
+def site_options(tmp_path):
+    content, template, docs = make_site(
+        str(tmp_path),
+        {"index.md": "# Home\n\n![logo](/logo.png)", "about/index.md": "# About"},
+        "<title>{{ Title }}</title>{{> footer.html }}{{ Content }}",
+    )
+    write_file(str(tmp_path / "static" / "logo.png"), "png")
+    write_file(str(tmp_path / "footer.html"), "<footer></footer>")
+    return {
+        "dir_path_content": content,
+        "template_path": template,
+        "dest_dir_path": docs,
+        "basepath": "/",
+        "manifest_path": str(tmp_path / "manifest.json"),
+        "static_dir_path": str(tmp_path / "static"),
+    }
+
+
+def test_find_static_refs(tmp_path):
+    write_file(str(tmp_path / "images" / "a.png"), "a")
+    markdown = (
+        "![a](/images/a.png) [again](/images/a.png#top) [missing](/images/b.png) "
+        "[page](/blog/) [out](https://example.com/a.png) [rel](images/a.png)"
+    )
+    assert find_static_refs(markdown, str(tmp_path)) == [
+        os.path.normpath(str(tmp_path / "images" / "a.png"))
+    ]
+    assert find_static_refs(markdown, None) == []
+
+
+def test_rebuild_reasons():
+    old = {"basepath": "/", "inputs": {"a.md": "1", "t.html": "1", "x.png": "1"}}
+    new = {"basepath": "/site/", "inputs": {"a.md": "1", "t.html": "2", "y.png": "1"}}
+    assert rebuild_reasons(None, new, True) == ["new page"]
+    assert rebuild_reasons(old, new, False) == ["output is missing"]
+    assert rebuild_reasons(old, old, True) == []
+    assert rebuild_reasons(old, new, True) == [
+        "basepath changed to /site/",
+        "t.html changed",
+        "y.png is a new input",
+        "x.png is no longer an input",
+    ]
+
+
+def test_partial_change_rebuilds_every_page(tmp_path):
+    site = site_options(tmp_path)
+    assert len(generate_pages_incremental(**site)) == 2
+    write_file(str(tmp_path / "footer.html"), "<footer>new</footer>")
+    assert len(generate_pages_incremental(**site)) == 2
+
+    graph = DependencyGraph(load_manifest(site["manifest_path"]))
+    index = os.path.join(site["dest_dir_path"], "index.html")
+    assert graph.explain(index) == [f"{tmp_path / 'footer.html'} changed"]
+    assert graph.explain(str(tmp_path / "nowhere.html")) is None
+
+
+def test_static_change_rebuilds_only_the_pages_that_reference_it(tmp_path):
+    site = site_options(tmp_path)
+    generate_pages_incremental(**site)
+    logo = str(tmp_path / "static" / "logo.png")
+    write_file(logo, "new png")
+    index = os.path.join(site["dest_dir_path"], "index.html")
+    assert generate_pages_incremental(**site) == [index]
+
+    graph = DependencyGraph(load_manifest(site["manifest_path"]))
+    assert graph.dependents({logo}) == {index}
+    assert graph.explain(index) == [f"{logo} changed"]
+    assert graph.dependents({site["template_path"]}) == {
+        index,
+        os.path.join(site["dest_dir_path"], "about", "index.html"),
+    }
+
+
+def test_image_table_change_rebuilds_only_the_pages_that_show_the_image(tmp_path):
+    site = site_options(tmp_path)
+    generate_pages_incremental(**site)
+    try:
+        set_image_table({"/other.png": {"width": 1, "height": 1, "variants": []}})
+        assert generate_pages_incremental(**site) == []
+        set_image_table({"/logo.png": {"width": 8, "height": 4, "variants": []}})
+        index = os.path.join(site["dest_dir_path"], "index.html")
+        assert generate_pages_incremental(**site) == [index]
+        graph = DependencyGraph(load_manifest(site["manifest_path"]))
+        assert graph.explain(index) == ["processed images changed"]
+    finally:
+        set_image_table({})
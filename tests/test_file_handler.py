@@ -0,0 +1,262 @@
+import os
+
+import pytest
+
+from static_site_gen.file_handler import (
+    PageGenerationError,
+    collect_page_jobs,
+    generate_pages_incremental,
+    generate_pages_recursive,
+    sync_files,
+)
+from static_site_gen.markdownparser import INLINE_CACHE_SIZE, set_inline_cache_size
+from static_site_gen.profiling import Profiler
+from static_site_gen.render_cache import RenderCache
+from tests.helpers import write_file
+
+
+def test_collect_page_jobs(tmp_path, site):
+    content, _, docs = site
+    jobs = collect_page_jobs(content, docs)
+    assert jobs == [
+        (
+            os.path.join(content, "blog", "post", "index.md"),
+            os.path.join(docs, "blog", "post", "index.html"),
+        ),
+        (os.path.join(content, "index.md"), os.path.join(docs, "index.html")),
+    ]
+
+
+def test_incremental_only_renders_changed_pages(tmp_path, site):
+    content, template, docs = site
+    manifest = str(tmp_path / "manifest.json")
+    rendered = generate_pages_incremental(content, template, docs, "/", manifest)
+    assert len(rendered) == 2
+
+    rendered = generate_pages_incremental(content, template, docs, "/", manifest)
+    assert rendered == []
+
+    write_file(os.path.join(content, "index.md"), "# Home\n\nChanged")
+    rendered = generate_pages_incremental(content, template, docs, "/", manifest)
+    assert rendered == [os.path.join(docs, "index.html")]
+
+
+def test_incremental_rebuilds_on_basepath_change(tmp_path, site):
+    content, template, docs = site
+    manifest = str(tmp_path / "manifest.json")
+    generate_pages_incremental(content, template, docs, "/", manifest)
+    rendered = generate_pages_incremental(content, template, docs, "/site/", manifest)
+    assert len(rendered) == 2
+
+
+def test_incremental_removes_deleted_pages(tmp_path, site):
+    content, template, docs = site
+    manifest = str(tmp_path / "manifest.json")
+    generate_pages_incremental(content, template, docs, "/", manifest)
+
+    os.remove(os.path.join(content, "blog", "post", "index.md"))
+    generate_pages_incremental(content, template, docs, "/", manifest)
+    assert not os.path.exists(os.path.join(docs, "blog"))
+    assert os.path.exists(os.path.join(docs, "index.html"))
+
+
+def test_generate_pages_parallel_matches_serial(tmp_path, site):
+    content, template, docs = site
+    serial_docs = str(tmp_path / "serial")
+    generate_pages_recursive(content, template, serial_docs, "/")
+    generate_pages_recursive(content, template, docs, "/", workers=2)
+    for _, dest_path in collect_page_jobs(content, docs):
+        serial_path = dest_path.replace(docs, serial_docs)
+        with open(dest_path) as parallel, open(serial_path) as serial:
+            assert parallel.read() == serial.read()
+
+
+def test_generate_pages_reports_every_failure(tmp_path, site):
+    content, template, docs = site
+    write_file(os.path.join(content, "a.md"), "no title here")
+    write_file(os.path.join(content, "b.md"), "no title either")
+    with pytest.raises(PageGenerationError) as err:
+        generate_pages_recursive(content, template, docs, "/", workers=2)
+    assert [from_path for from_path, _ in err.value.failures] == [
+        os.path.join(content, "a.md"),
+        os.path.join(content, "b.md"),
+    ]
+    assert os.path.exists(os.path.join(docs, "index.html"))
+
+
+def make_static(tmp_path):
+    static = tmp_path / "static"
+    write_file(str(static / "index.css"), "body {}")
+    write_file(str(static / "images" / "tom.png"), "not really a png")
+    return str(static), str(tmp_path / "docs"), str(tmp_path / "static.json")
+
+
+def test_sync_files_skips_unchanged(tmp_path):
+    static, docs, manifest = make_static(tmp_path)
+    assert len(sync_files(static, docs, manifest)) == 2
+    assert sync_files(static, docs, manifest) == []
+
+    write_file(os.path.join(static, "index.css"), "body { color: red; }")
+    assert sync_files(static, docs, manifest) == [os.path.join(docs, "index.css")]
+
+
+def test_sync_files_removes_deleted_sources_only(tmp_path):
+    static, docs, manifest = make_static(tmp_path)
+    sync_files(static, docs, manifest)
+    write_file(os.path.join(docs, "index.html"), "generated page")
+
+    os.remove(os.path.join(static, "images", "tom.png"))
+    sync_files(static, docs, manifest)
+    assert not os.path.exists(os.path.join(docs, "images"))
+    assert os.path.exists(os.path.join(docs, "index.html"))
+
+
+def test_sync_files_checksum_ignores_touched_files(tmp_path):
+    static, docs, manifest = make_static(tmp_path)
+    sync_files(static, docs, manifest)
+    os.utime(os.path.join(static, "index.css"), ns=(0, 0))
+    assert sync_files(static, docs, manifest, checksum=True) == []
+    assert len(sync_files(static, docs, manifest)) == 0
+
+
+def test_sync_files_hard_link(tmp_path):
+    static, docs, manifest = make_static(tmp_path)
+    sync_files(static, docs, manifest, link=True)
+    source = os.stat(os.path.join(static, "index.css"))
+    published = os.stat(os.path.join(docs, "index.css"))
+    assert source.st_ino == published.st_ino
+
+    write_file(os.path.join(static, "index.css"), "body { color: red; }")
+    sync_files(static, docs, manifest)
+    with open(os.path.join(docs, "index.css")) as published_file:
+        assert published_file.read() == "body { color: red; }"
+
+
+def test_sync_files_links_unchanged_files_from_the_published_dir(tmp_path):
+    static, docs, manifest = make_static(tmp_path)
+    sync_files(static, docs, manifest)
+    write_file(os.path.join(static, "index.css"), "body { color: red; }")
+    staging = str(tmp_path / "docs.staging")
+    synced = sync_files(
+        static, staging, str(tmp_path / "staging.json"), published_dir_path=docs
+    )
+    assert sorted(synced) == [
+        os.path.join(staging, "images", "tom.png"),
+        os.path.join(staging, "index.css"),
+    ]
+    published = os.stat(os.path.join(docs, "images", "tom.png"))
+    assert os.stat(os.path.join(staging, "images", "tom.png")).st_ino == (
+        published.st_ino
+    )
+    assert os.stat(os.path.join(staging, "index.css")).st_ino != (
+        os.stat(os.path.join(docs, "index.css")).st_ino
+    )
+    with open(os.path.join(staging, "index.css")) as staged_file:
+        assert staged_file.read() == "body { color: red; }"
+
+
+def test_generate_pages_profiled_matches_streamed(tmp_path, site):
+    content, template, docs = site
+    streamed_docs = str(tmp_path / "streamed")
+    generate_pages_recursive(content, template, streamed_docs, "/")
+    profiler = Profiler()
+    generate_pages_recursive(content, template, docs, "/", profiler=profiler)
+    for _, dest_path in collect_page_jobs(content, docs):
+        streamed_path = dest_path.replace(docs, streamed_docs)
+        with open(dest_path) as profiled, open(streamed_path) as streamed:
+            assert profiled.read() == streamed.read()
+    for stage in ("block split", "block typing", "inline parse"):
+        assert profiler.stages[stage][2] == 2
+    assert len(profiler.pages) == 2
+
+
+def test_generate_pages_with_render_cache(tmp_path, site):
+    content, template, docs = site
+    uncached_docs = str(tmp_path / "uncached")
+    generate_pages_recursive(content, template, uncached_docs, "/")
+    cache = RenderCache(str(tmp_path / "cache"))
+    generate_pages_recursive(content, template, docs, "/", cache=cache)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 2
+    # Second build is served from the cache
+    generate_pages_recursive(content, template, docs, "/", cache=cache)
+    for _, dest_path in collect_page_jobs(content, docs):
+        uncached_path = dest_path.replace(docs, uncached_docs)
+        with open(dest_path) as cached, open(uncached_path) as uncached:
+            assert cached.read() == uncached.read()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_pages_async_matches_sync(tmp_path, site, workers):
+    content, template, docs = site
+    sync_docs = str(tmp_path / "sync")
+    generate_pages_recursive(content, template, sync_docs, "/")
+    generate_pages_recursive(
+        content, template, docs, "/", workers=workers, io_concurrency=4
+    )
+    for _, dest_path in collect_page_jobs(content, docs):
+        sync_path = dest_path.replace(docs, sync_docs)
+        with open(dest_path) as async_file, open(sync_path) as sync_file:
+            assert async_file.read() == sync_file.read()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_pages_async_profiles_every_page(site, workers):
+    content, template, docs = site
+    write_file(os.path.join(content, "again.md"), "# Again\n\nText\n\nText")
+    profiler = Profiler()
+    try:
+        # Pool workers get the memo size of the build too
+        set_inline_cache_size(0)
+        generate_pages_recursive(
+            content,
+            template,
+            docs,
+            "/",
+            workers=workers,
+            profiler=profiler,
+            io_concurrency=2,
+        )
+    finally:
+        set_inline_cache_size(INLINE_CACHE_SIZE)
+    for stage in (
+        "read",
+        "block split",
+        "block typing",
+        "inline parse",
+        "html emit",
+        "template fill",
+        "write",
+    ):
+        assert profiler.stages[stage][2] == 3
+    assert len(profiler.pages) == 3
+    assert profiler.counters["inline cache hits"] == 0
+    assert profiler.counters["inline cache misses"] > 0
+
+
+def test_generate_pages_async_reports_failures(tmp_path, site):
+    content, template, docs = site
+    write_file(os.path.join(content, "a.md"), "no title here")
+    with pytest.raises(PageGenerationError) as err:
+        generate_pages_recursive(content, template, docs, "/", io_concurrency=2)
+    assert [from_path for from_path, _ in err.value.failures] == [
+        os.path.join(content, "a.md")
+    ]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"profiler": Profiler()}, {"io_concurrency": 2}],
+    ids=["streaming", "staged", "async"],
+)
+def test_front_matter_is_stripped_and_sets_the_title(tmp_path, site, options):
+    content, template, docs = site
+    write_file(
+        os.path.join(content, "index.md"),
+        "---\ntitle: From front matter\ndate: 2024-05-01\n---\nNo heading here\n",
+    )
+    generate_pages_recursive(content, template, docs, "/", **options)
+    with open(os.path.join(docs, "index.html")) as page_file:
+        assert page_file.read() == (
+            "<title>From front matter</title>"
+            "<main><div><p>No heading here</p></div></main>"
+        )
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from static_site_gen.frontmatter import (
+    MetadataCache,
+    parse_value,
+    read_front_matter,
+    read_page_metadata,
+    split_front_matter,
+)
+
+
+def test_parse_value():
+    assert parse_value(' "quoted: text" ') == "quoted: text"
+    assert parse_value("12") == 12
+    assert parse_value("1.5") == 1.5
+    assert parse_value("true") is True
+    assert parse_value("[a, 'b', 3]") == ["a", "b", 3]
+    assert parse_value("[]") == []
+    assert parse_value("2024-05-01") == "2024-05-01"
+
+
+def test_split_yaml_front_matter():
+    lines = ["---", "title: Tom", "tags:", "  - lore", "  - rant", "---", "# Body"]
+    metadata, body = split_front_matter(lines)
+    assert metadata == {"title": "Tom", "tags": ["lore", "rant"]}
+    assert list(body) == ["# Body"]
+
+
+def test_split_toml_front_matter():
+    lines = ["+++\n", 'title = "Tom"\n', "draft = false\n", "+++\n", "# Body\n"]
+    metadata, body = split_front_matter(lines)
+    assert metadata == {"title": "Tom", "draft": False}
+    assert list(body) == ["# Body\n"]
+
+
+def test_split_without_front_matter_keeps_every_line():
+    metadata, body = split_front_matter(["# Title", "", "Text"])
+    assert metadata == {}
+    assert list(body) == ["# Title", "", "Text"]
+
+
+def test_split_front_matter_errors():
+    with pytest.raises(ValueError, match="missing its closing ---"):
+        split_front_matter(["---", "title: Tom", "# Body"])
+    with pytest.raises(ValueError, match="Invalid front matter line"):
+        split_front_matter(["---", "just words", "---"])
+    # A list item can't follow a key that already has a value
+    with pytest.raises(ValueError, match="Invalid front matter line: - b"):
+        split_front_matter(["---", "tags: a", "- b", "---"])
+
+
+def test_split_front_matter_does_not_read_the_body():
+    def lines():
+        yield from ["---", "title: Tom", "---"]
+        raise AssertionError("body was read")
+
+    metadata, _ = split_front_matter(lines())
+    assert metadata == {"title": "Tom"}
+
+
+def test_metadata_cache_reuses_entries_until_the_file_changes(tmp_path):
+    page = tmp_path / "index.md"
+    page.write_text("---\ntitle: One\n---\n# One\n")
+    cache_path = str(tmp_path / "metadata.json")
+    cache = MetadataCache(cache_path)
+    assert cache.get(str(page)) == {"title": "One"}
+    assert cache.get(str(page)) == {"title": "One"}
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save()
+
+    cache = MetadataCache(cache_path)
+    assert cache.get(str(page)) == {"title": "One"}
+    assert cache.hits == 1
+
+    page.write_text("---\ntitle: Two\n---\n# Two\n")
+    stat = os.stat(page)
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.get(str(page)) == {"title": "Two"}
+    assert read_front_matter(str(page)) == {"title": "Two"}
+
+    cache.prune(set())
+    assert cache.entries == {}
+
+
+def test_read_page_metadata_falls_back_to_the_first_h1(tmp_path):
+    page = tmp_path / "index.md"
+    page.write_text("---\ndate: 2024-05-01\n---\nIntro\n\n# Tom\n\n# Other\n")
+    assert read_page_metadata(str(page)) == {"date": "2024-05-01", "title": "Tom"}
+    page.write_text("No heading\n")
+    assert read_page_metadata(str(page)) == {"title": None}
@@ -120,3 +120,46 @@ def test_parentnode_with_no_children():
     node = ParentNode(tag=tag, children=children)
     expected = "<a></a>"
     assert node.to_html() == expected
+
+
+def test_parentnode_rewrites_urls_under_basepath():
+    children = [
+        LeafNode(tag="a", value="home", props={"href": "/blog"}),
+        LeafNode(tag="img", value="", props={"src": "/tom.png", "alt": "/tom"}),
+        LeafNode(tag="a", value="away", props={"href": "https://boot.dev"}),
+    ]
+    node = ParentNode(tag="p", children=children)
+    expected = '<p><a href="/site/blog">home</a><img src="/site/tom.png" alt="/tom" /><a href="https://boot.dev">away</a></p>'
+    assert node.to_html("/site/") == expected
+
+
+def test_parentnode_write_to_matches_to_html():
+    child_parent = ParentNode(tag="p", children=[LeafNode(tag="b", value="bold")])
+    node = ParentNode(tag="div", children=[child_parent, LeafNode(None, "text")])
+    chunks = []
+
+    class Writer:
+        def writelines(self, lines):
+            chunks.extend(lines)
+
+    node.write_to(Writer())
+    assert chunks == ["<div>", "<p>", "<b>bold</b>", "</p>", "text", "</div>"]
+    assert "".join(chunks) == node.to_html()
+
+
+def test_parentnode_without_tag_raises():
+    node = ParentNode(tag=None, children=[])
+    with pytest.raises(ValueError, match="Parent node needs a tag."):
+        node.to_html()
+
+
+def test_iter_text():
+    node = ParentNode(
+        "p",
+        [
+            LeafNode("b", "Bold"),
+            LeafNode(None, " and "),
+            LeafNode("img", "", {"src": "/a.png", "alt": "alt text"}),
+        ],
+    )
+    assert list(node.iter_text()) == ["Bold", " and ", "alt text"]
@@ -0,0 +1,154 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from static_site_gen import images
+from static_site_gen.images import image_size, plan_images, process_images
+from static_site_gen.markdownparser import markdown_to_html_node, set_image_table
+from static_site_gen.render_cache import RenderCache
+
+
+def png_bytes(width, height):
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    rows = b"".join(b"\x00" + b"\x80\x40\x20" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_bytes(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+@pytest.fixture
+def image_table():
+    yield
+    set_image_table({})
+
+
+def test_image_size_reads_headers(tmp_path):
+    write_bytes(str(tmp_path / "a.png"), png_bytes(12, 7))
+    write_bytes(str(tmp_path / "a.gif"), b"GIF89a" + struct.pack("<HH", 30, 20) + b"\0")
+    jpeg = (
+        b"\xff\xd8"
+        + b"\xff\xe0"
+        + struct.pack(">H", 16)
+        + b"JFIF\0"
+        + b"\0" * 9
+        + b"\xff\xc0"
+        + struct.pack(">HBHH", 17, 8, 40, 50)
+        + b"\0" * 10
+    )
+    write_bytes(str(tmp_path / "a.jpg"), jpeg)
+    write_bytes(str(tmp_path / "a.txt"), b"not an image")
+    assert image_size(str(tmp_path / "a.png")) == (12, 7)
+    assert image_size(str(tmp_path / "a.gif")) == (30, 20)
+    assert image_size(str(tmp_path / "a.jpg")) == (50, 40)
+    if images.Image is None:
+        assert image_size(str(tmp_path / "a.txt")) is None
+
+
+def test_plan_images_without_pillow_only_measures(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "Image", None)
+    source = str(tmp_path / "static" / "images" / "a.png")
+    write_bytes(source, png_bytes(64, 32))
+    docs = str(tmp_path / "docs")
+    assets = [(source, os.path.join(docs, "images", "a.png"))]
+    table, variants = plan_images(assets, docs, str(tmp_path / "cache"), (16, 128))
+    assert table == {"/images/a.png": {"width": 64, "height": 32, "variants": []}}
+    assert variants == []
+
+
+def test_img_tags_describe_processed_images(image_table):
+    set_image_table(
+        {
+            "/images/a.png": {
+                "width": 64,
+                "height": 32,
+                "variants": [["/images/a-16w.png", 16]],
+            }
+        }
+    )
+    html = markdown_to_html_node("![A](/images/a.png) ![B](/b.png)").to_html("/site/")
+    assert html == (
+        '<div><p><img src="/site/images/a.png" alt="A" width="64" height="32" '
+        'srcset="/site/images/a-16w.png 16w, /site/images/a.png 64w" '
+        'sizes="(max-width: 64px) 100vw, 64px" loading="lazy" /> '
+        '<img src="/site/b.png" alt="B" /></p></div>'
+    )
+    set_image_table({})
+    assert markdown_to_html_node("![A](/images/a.png)").to_html() == (
+        '<div><p><img src="/images/a.png" alt="A" /></p></div>'
+    )
+
+
+def test_render_cache_key_covers_image_table(tmp_path, image_table):
+    cache = RenderCache(str(tmp_path))
+    plain_key = cache.key("![A](/a.png)", "/")
+    set_image_table({"/a.png": {"width": 1, "height": 1, "variants": []}})
+    assert cache.key("![A](/a.png)", "/") != plain_key
+
+
+def test_process_images_resizes_into_cache(tmp_path):
+    pytest.importorskip("PIL")
+    source = str(tmp_path / "static" / "images" / "a.png")
+    write_bytes(source, png_bytes(64, 32))
+    docs = str(tmp_path / "docs")
+    assets = [(source, os.path.join(docs, "images", "a.png"))]
+    manifest = str(tmp_path / "manifest.json")
+    cache_dir = str(tmp_path / "cache")
+    table = process_images(assets, docs, manifest, cache_dir, (16, 32, 128), workers=2)
+    assert table["/images/a.png"]["variants"] == [
+        ["/images/a-16w.png", 16],
+        ["/images/a-32w.png", 32],
+    ]
+    assert image_size(os.path.join(docs, "images", "a-16w.png")) == (16, 8)
+
+    # A narrower list of widths removes the variants that are no longer wanted
+    process_images(assets, docs, manifest, cache_dir, (32,))
+    assert not os.path.exists(os.path.join(docs, "images", "a-16w.png"))
+    assert os.path.exists(os.path.join(docs, "images", "a-32w.png"))
+
+
+def test_render_cache_key_covers_only_the_page_images(tmp_path, image_table):
+    cache = RenderCache(str(tmp_path))
+    plain_key = cache.key("![B](/b.png)", "/")
+    set_image_table({"/a.png": {"width": 1, "height": 1, "variants": []}})
+    assert cache.key("![B](/b.png)", "/") == plain_key
+
+
+def test_rotated_jpeg_is_measured_and_resized_upright(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    source = str(tmp_path / "static" / "images" / "photo.jpg")
+    os.makedirs(os.path.dirname(source))
+    # Stored landscape, displayed portrait
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (64, 32)).save(source, exif=exif)
+    assert image_size(source) == (32, 64)
+
+    docs = str(tmp_path / "docs")
+    assets = [(source, os.path.join(docs, "images", "photo.jpg"))]
+    manifest = str(tmp_path / "manifest.json")
+    table = process_images(assets, docs, manifest, str(tmp_path / "cache"), (16,))
+    assert table["/images/photo.jpg"] == {
+        "width": 32,
+        "height": 64,
+        "variants": [["/images/photo-16w.jpg", 16]],
+    }
+    variant = os.path.join(docs, "images", "photo-16w.jpg")
+    with Image.open(variant) as image:
+        assert image.size == (16, 32)
+        assert image.getexif().get(0x0112) in (None, 1)
+    assert image_size(variant) == (16, 32)
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from static_site_gen.file_handler import (
+    generate_pages_incremental,
+    generate_pages_recursive,
+)
+from static_site_gen.frontmatter import MetadataCache
+from static_site_gen.listing import (
+    Listing,
+    PageEntry,
+    SiteIndex,
+    build_site_index,
+    page_url,
+    sort_pages,
+)
+from tests.helpers import make_site, read_file, write_file
+
+
+def make_blog(tmp_path, posts):
+    pages = {"index.md": "# Home"}
+    for slug, date in posts:
+        front_matter = f"---\ndate: {date}\n---\n" if date else ""
+        pages[f"blog/{slug}/index.md"] = f"{front_matter}# {slug}"
+    return make_site(str(tmp_path), pages)
+
+
+def test_page_url():
+    assert page_url("docs/index.html", "docs") == "/"
+    assert page_url("docs/blog/tom/index.html", "docs/") == "/blog/tom/"
+    assert page_url("docs/contact.html", "docs") == "/contact.html"
+
+
+def test_sort_pages():
+    pages = [
+        PageEntry("a.md", "/a/", {"title": "B", "date": "2024-01-01"}),
+        PageEntry("b.md", "/b/", {"title": "C"}),
+        PageEntry("c.md", "/c/", {"title": "A", "date": "2024-01-01"}),
+        PageEntry("d.md", "/d/", {"title": "D", "date": "2024-03-01"}),
+    ]
+    assert [page.title for page in sort_pages(pages)] == ["D", "A", "B", "C"]
+    assert [page.title for page in sort_pages(pages, "title")] == ["A", "B", "C", "D"]
+    with pytest.raises(ValueError, match="Unknown listing sort"):
+        sort_pages(pages, "size")
+
+
+def test_site_index_section_leaves_out_the_section_index():
+    site_index = SiteIndex()
+    for url in ["/", "/blog/", "/blog/tom/", "/blog/tom/notes/", "/blogroll/"]:
+        site_index.add(PageEntry(url, url, {}))
+    assert [page.url for page in site_index.section("blog")] == [
+        "/blog/tom/",
+        "/blog/tom/notes/",
+    ]
+
+
+def test_build_site_index_reads_metadata_only(tmp_path):
+    content, _, docs = make_blog(tmp_path, [("tom", "2024-01-01")])
+    # The body after the title would fail to parse, the index never gets there
+    write_file(os.path.join(content, "blog", "tom", "index.md"), "# Tom\n\n**broken")
+    page_jobs = [
+        (os.path.join(content, "blog", "tom", "index.md"), "docs/blog/tom/index.html")
+    ]
+    site_index = build_site_index(page_jobs, "docs", MetadataCache())
+    assert site_index.pages[0].title == "Tom"
+    assert site_index.pages[0].url == "/blog/tom/"
+
+
+def test_listing_pages_are_paginated(tmp_path):
+    posts = [("one", "2024-01-01"), ("two", "2024-02-01"), ("three", None)]
+    content, template, docs = make_blog(tmp_path, posts)
+    generate_pages_recursive(
+        content, template, docs, "/site/", listings=[Listing("blog", per_page=2)]
+    )
+    assert read_file(os.path.join(docs, "blog", "index.html")) == (
+        "<title>Blog</title><main><div><h1>Blog</h1><ul>"
+        '<li><a href="/site/blog/two/">two</a> <time datetime="2024-02-01">2024-02-01</time></li>'
+        '<li><a href="/site/blog/one/">one</a> <time datetime="2024-01-01">2024-01-01</time></li>'
+        '</ul><nav><a href="/site/blog/page/2/" rel="next">Older</a></nav></div></main>'
+    )
+    assert read_file(os.path.join(docs, "blog", "page", "2", "index.html")) == (
+        "<title>Blog, page 2</title><main><div><h1>Blog, page 2</h1><ul>"
+        '<li><a href="/site/blog/three/">three</a></li>'
+        '</ul><nav><a href="/site/blog/" rel="prev">Newer</a></nav></div></main>'
+    )
+
+
+def test_listing_refuses_to_overwrite_a_page(tmp_path):
+    content, template, docs = make_blog(tmp_path, [("one", None)])
+    write_file(os.path.join(content, "blog", "index.md"), "# Blog")
+    with pytest.raises(ValueError, match="would overwrite the page at /blog/"):
+        generate_pages_recursive(
+            content, template, docs, "/", listings=[Listing("blog")]
+        )
+
+
+def test_incremental_removes_listing_pages_that_are_gone(tmp_path):
+    content, template, docs = make_blog(tmp_path, [("one", None), ("two", None)])
+    manifest = str(tmp_path / "manifest.json")
+    metadata_cache = MetadataCache(str(tmp_path / "metadata.json"))
+    listings = [Listing("blog", per_page=1)]
+    generate_pages_incremental(
+        content,
+        template,
+        docs,
+        "/",
+        manifest,
+        listings=listings,
+        metadata_cache=metadata_cache,
+    )
+    second_page = os.path.join(docs, "blog", "page", "2", "index.html")
+    assert os.path.exists(second_page)
+
+    os.remove(os.path.join(content, "blog", "two", "index.md"))
+    metadata_cache = MetadataCache(str(tmp_path / "metadata.json"))
+    rendered = generate_pages_incremental(
+        content,
+        template,
+        docs,
+        "/",
+        manifest,
+        listings=listings,
+        metadata_cache=metadata_cache,
+    )
+    assert rendered == []
+    assert not os.path.exists(second_page)
+    assert "/blog/two/" not in read_file(os.path.join(docs, "blog", "index.html"))
+    assert (metadata_cache.hits, metadata_cache.misses) == (2, 0)
@@ -2,18 +2,27 @@ import pytest
 
 from static_site_gen.htmlnode import LeafNode, ParentNode
 from static_site_gen.markdownparser import (
+    INLINE_CACHE_SIZE,
     MarkdownBlockType,
     block_to_block_type,
+    block_to_block_type_chain,
     extract_markdown_images,
     extract_markdown_links,
+    extract_title_from_lines,
+    inline_cache_info,
+    iter_markdown_blocks,
+    iter_markdown_html,
     markdown_to_blocks,
     markdown_to_html_node,
+    parse_markdown,
+    set_inline_cache_size,
     split_nodes_delimiter,
     split_nodes_images,
     split_nodes_links,
     text_to_textnodes,
     extract_title,
 )
+from static_site_gen.profiling import Profiler
 from static_site_gen.textnode import TextNode, TextType
 
 
@@ -489,3 +498,166 @@ with some paragraph too
 but only the heading should come.
 """
     assert extract_title(markdown) == "This is a document"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+        "[link](https://boot.dev) with _snake_ and **bold** [again](/blog/tom)",
+        "***nested*** stars",
+        "",
+        "plain text only",
+    ],
+)
+def test_text_to_textnodes_matches_legacy(text):
+    assert text_to_textnodes(text) == text_to_textnodes(text, legacy=True)
+
+
+def test_text_to_textnodes_unmatched_delimiter():
+    with pytest.raises(SyntaxError, match="Invalid markdown syntax"):
+        text_to_textnodes("This is **unclosed bold")
+
+
+def test_text_to_textnodes_repeated_links():
+    text = "![x](y) and [x](y)"
+    expected = [
+        TextNode("x", TextType.MD_IMAGE, "y"),
+        TextNode(" and ", TextType.MD_TEXT),
+        TextNode("x", TextType.MD_LINK, "y"),
+    ]
+    assert text_to_textnodes(text) == expected
+
+
+def test_text_to_textnodes_delimiters_inside_code():
+    text = "call `snake_case()` here"
+    expected = [
+        TextNode("call ", TextType.MD_TEXT),
+        TextNode("snake_case()", TextType.MD_CODE),
+        TextNode(" here", TextType.MD_TEXT),
+    ]
+    assert text_to_textnodes(text) == expected
+
+
+def test_iter_markdown_blocks_fenced_code_with_blank_lines():
+    lines = [
+        "# heading\n",
+        "\n",
+        "```\n",
+        "first line\n",
+        "\n",
+        "after blank\n",
+        "```\n",
+        "- list item\n",
+    ]
+    assert list(iter_markdown_blocks(lines)) == [
+        (MarkdownBlockType.HEADING, "# heading"),
+        (MarkdownBlockType.CODE, "```\nfirst line\n\nafter blank\n```"),
+        (MarkdownBlockType.UO_LIST, "- list item"),
+    ]
+
+
+def test_iter_markdown_blocks_matches_markdown_to_blocks():
+    markdown_doc = "# heading\n\n\n\n\n     Paragraph text within the document\nThat can span multiple lines                  \n\n- list item 1\n- list item 2\n"
+    blocks = [block for _, block in iter_markdown_blocks(markdown_doc.split("\n"))]
+    assert blocks == markdown_to_blocks(markdown_doc)
+
+
+def test_iter_markdown_html_matches_to_html():
+    markdown = "# Title\n\nSome **bold** text\n\n```\ncode\n\nmore code\n```\n"
+    streamed = "".join(iter_markdown_html(markdown.split("\n")))
+    assert streamed == markdown_to_html_node(markdown).to_html()
+    assert "<pre><code>\ncode\n\nmore code\n</code></pre>" in streamed
+
+
+@pytest.fixture
+def inline_memo():
+    """Lets a test resize the process-wide inline memo, and restores it afterwards."""
+    yield set_inline_cache_size
+    set_inline_cache_size(INLINE_CACHE_SIZE)
+
+
+def test_inline_memo_reuses_fragments(inline_memo):
+    inline_memo(16)
+    markdown = "- [Home](/)\n- [Blog](/blog)\n\n- [Home](/)\n- [Blog](/blog)"
+    html_node = markdown_to_html_node(markdown)
+    info = inline_cache_info()
+    assert info.misses == 2
+    assert info.hits == 2
+    first_list, second_list = html_node.children
+    assert first_list.children[0].children is not second_list.children[0].children
+    assert first_list.children[0].children == second_list.children[0].children
+
+
+def test_inline_memo_disabled(inline_memo):
+    inline_memo(0)
+    first, second = markdown_to_html_node("Same **text**\n\nSame **text**").children
+    # Without the memo every paragraph parses its own fragments
+    assert first.children == second.children
+    assert first.children is not second.children
+    assert all(
+        first_child is not second_child
+        for first_child, second_child in zip(first.children, second.children)
+    )
+
+
+@pytest.mark.parametrize(
+    "markdown_block",
+    [
+        "# Heading",
+        "####### not a heading",
+        "```code```",
+        "```not closed",
+        "> quote\n> more",
+        "> quote\nnot quote",
+        "- item\n* item",
+        "- item\nnot item",
+        "-not a list",
+        "1. one\n2. two",
+        "1. one\n3. three",
+        "plain",
+        "",
+    ],
+)
+def test_block_to_block_type_matches_chain(markdown_block):
+    assert block_to_block_type(markdown_block) == block_to_block_type_chain(
+        markdown_block
+    )
+
+
+def test_parse_markdown_collects_title_and_headings():
+    markdown = "Intro paragraph\n\n# The Title\n\n## Section **one**\n\n### Sub\n"
+    result = parse_markdown(markdown.split("\n"))
+    assert result.title == "The Title"
+    assert result.headings == [(1, "The Title"), (2, "Section **one**"), (3, "Sub")]
+    assert result.node == markdown_to_html_node(markdown)
+
+
+def test_parse_markdown_profiled_stages_match_the_streamed_parse():
+    markdown = "Intro\n\n# The Title\n\n```\ncode\n\nmore\n```\n\n## Section\n"
+    profiler = Profiler()
+    result = parse_markdown(markdown.split("\n"), profiler, "page.md")
+    streamed = parse_markdown(markdown.split("\n"))
+    assert result.node == streamed.node
+    assert (result.title, result.headings) == (streamed.title, streamed.headings)
+    assert sorted(profiler.stages) == ["block split", "block typing", "inline parse"]
+    assert list(profiler.pages) == ["page.md"]
+
+
+def test_parse_markdown_missing_title():
+    result = parse_markdown(["Just text"])
+    assert result.title is None
+    with pytest.raises(Exception, match="Document is missing h1 header."):
+        result.require_title()
+
+
+def test_extract_title_from_lines_stops_at_first_h1():
+    read = []
+
+    def lines():
+        for line in ["intro\n", "# Title\n", "more\n", "# Other\n"]:
+            read.append(line)
+            yield line
+
+    assert extract_title_from_lines(lines()) == "Title"
+    assert read == ["intro\n", "# Title\n"]
@@ -0,0 +1,47 @@
+import json
+
+from static_site_gen.profiling import Profiler, maybe_stage
+
+
+def test_profiler_records_stage_and_page():
+    profiler = Profiler()
+    with profiler.stage("read", "index.md"):
+        pass
+    with profiler.stage("read", "other.md"):
+        pass
+    assert profiler.stages["read"][2] == 2
+    assert set(profiler.pages) == {"index.md", "other.md"}
+    assert len(profiler.events) == 2
+
+
+def test_profiler_merge():
+    worker = Profiler()
+    with worker.stage("inline parse", "index.md"):
+        pass
+    profiler = Profiler()
+    with profiler.stage("inline parse", "about.md"):
+        pass
+    profiler.merge(json.loads(json.dumps(worker.to_dict())))
+    assert profiler.stages["inline parse"][2] == 2
+    assert set(profiler.pages) == {"index.md", "about.md"}
+
+
+def test_profiler_report_and_trace(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("write", "index.md"):
+        pass
+    report = profiler.report()
+    assert "write" in report
+    assert "slowest 1 of 1 pages:" in report
+
+    trace_path = str(tmp_path / "trace.json")
+    profiler.write_trace(trace_path)
+    with open(trace_path) as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert events[0]["name"] == "write"
+    assert events[0]["ph"] == "X"
+
+
+def test_maybe_stage_without_profiler():
+    with maybe_stage(None, "build"):
+        pass
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from static_site_gen.file_handler import generate_pages
+from static_site_gen.publish import (
+    files_identical,
+    prepare_staging,
+    publish_staging,
+    write_if_changed,
+)
+from tests.helpers import write_file
+
+
+def set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_files_identical(tmp_path):
+    write_file(str(tmp_path / "a"), "same")
+    write_file(str(tmp_path / "b"), "same")
+    write_file(str(tmp_path / "c"), "diff")
+    assert files_identical(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert not files_identical(str(tmp_path / "a"), str(tmp_path / "c"))
+    assert not files_identical(str(tmp_path / "a"), str(tmp_path / "missing"))
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = str(tmp_path / "page.html")
+    write_file(path, "<p>page</p>")
+    set_mtime(path, 10**9)
+    with write_if_changed(path) as page_file:
+        page_file.write("<p>page</p>")
+    assert os.stat(path).st_mtime_ns == 10**9
+
+    with write_if_changed(path) as page_file:
+        page_file.write("<p>new</p>")
+    assert os.stat(path).st_mtime_ns != 10**9
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_write_if_changed_keeps_the_old_file_on_errors(tmp_path):
+    path = str(tmp_path / "page.html")
+    write_file(path, "<p>page</p>")
+    with pytest.raises(RuntimeError):
+        with write_if_changed(path) as page_file:
+            page_file.write("<p>half")
+            raise RuntimeError("render failed")
+    with open(path) as page_file:
+        assert page_file.read() == "<p>page</p>"
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_publish_staging_swaps_and_keeps_unchanged_mtimes(tmp_path):
+    docs = str(tmp_path / "docs")
+    write_file(os.path.join(docs, "same.html"), "same")
+    write_file(os.path.join(docs, "changed.html"), "old")
+    write_file(os.path.join(docs, "stale", "gone.html"), "gone")
+    set_mtime(os.path.join(docs, "same.html"), 10**9)
+
+    write_file(os.path.join(docs + ".staging", "left", "over.html"), "crashed build")
+    staging_dir = prepare_staging(docs)
+    assert os.listdir(staging_dir) == []
+    write_file(os.path.join(staging_dir, "same.html"), "same")
+    write_file(os.path.join(staging_dir, "changed.html"), "new")
+    publish_staging(staging_dir, docs)
+
+    assert sorted(os.listdir(tmp_path)) == ["docs"]
+    assert sorted(os.listdir(docs)) == ["changed.html", "same.html"]
+    assert os.stat(os.path.join(docs, "same.html")).st_mtime_ns == 10**9
+    with open(os.path.join(docs, "changed.html")) as page_file:
+        assert page_file.read() == "new"
+
+
+def test_rerendering_an_unchanged_page_keeps_its_mtime(tmp_path):
+    write_file(str(tmp_path / "content" / "index.md"), "# Home\n\nText")
+    write_file(str(tmp_path / "template.html"), "{{ Title }}{{ Content }}")
+    dest_path = str(tmp_path / "docs" / "index.html")
+    jobs = [(str(tmp_path / "content" / "index.md"), dest_path)]
+    generate_pages(jobs, str(tmp_path / "template.html"), "/")
+    set_mtime(dest_path, 10**9)
+    generate_pages(jobs, str(tmp_path / "template.html"), "/")
+    assert os.stat(dest_path).st_mtime_ns == 10**9
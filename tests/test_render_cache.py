@@ -0,0 +1,64 @@
+import os
+
+from static_site_gen import render_cache
+from static_site_gen.render_cache import MemoryRenderCache, RenderCache
+
+
+def test_render_cache_round_trip(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key("# Title\n\nText", "/")
+    assert cache.get(key) is None
+    cache.put(key, "Title", "<div><h1>Title</h1></div>", ["title"])
+    assert cache.get(key) == ("Title", "<div><h1>Title</h1></div>", ["title"])
+
+
+def test_render_cache_key_covers_basepath(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert cache.key("# Title", "/") != cache.key("# Title", "/site/")
+    assert cache.key("# Title", "/") == cache.key("# Title", "/")
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=0)
+    keys = [cache.key(f"# Page {idx}", "/") for idx in range(3)]
+    for idx, key in enumerate(keys):
+        cache.put(key, f"Page {idx}", "x" * 100, [])
+        os.utime(cache.entry_path(key), ns=(idx, idx))
+    entry_size = os.path.getsize(cache.entry_path(keys[0]))
+    cache.max_bytes = entry_size * 2
+    # Reading the oldest entry makes it the most recently used
+    cache.get(keys[0])
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+def test_memory_render_cache_evicts_least_recently_used():
+    cache = MemoryRenderCache(max_bytes=20)
+    keys = [cache.key(f"# Page {idx}", "/") for idx in range(3)]
+    for idx, key in enumerate(keys):
+        cache.put(key, f"P{idx}", "x" * 6, ["xx"])
+    cache.get(keys[0])
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) == ("P0", "x" * 6, ["xx"])
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_render_cache_ignores_entries_of_older_parser_versions(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    markdown = "---\ntitle: Real\n---\n# Heading"
+    monkeypatch.setattr(render_cache, "PARSER_VERSION", "1")
+    cache.put(cache.key(markdown, "/"), "Heading", "<div><p>---</p></div>", [])
+    monkeypatch.undo()
+    assert cache.get(cache.key(markdown, "/")) is None
+
+
+def test_render_cache_ignores_entries_without_terms(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key("# Title", "/")
+    cache.put(key, "Title", "<div><h1>Title</h1></div>", ["title"])
+    with open(cache.entry_path(key), "w") as entry_file:
+        entry_file.write('{"title": "Title", "html": "<div><h1>Title</h1></div>"}')
+    assert cache.get(key) is None
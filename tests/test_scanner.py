@@ -0,0 +1,76 @@
+import os
+
+from static_site_gen.scanner import (
+    list_directory,
+    matches,
+    page_dest_path,
+    scan_site,
+    scan_tree,
+    set_listing_cache,
+)
+from tests.helpers import write_file
+
+
+def test_matches_names_and_relative_paths():
+    assert matches("blog/post.md", ("*.md",))
+    assert matches("blog/.post.md.swp", ("*.swp",))
+    assert matches("drafts/post.md", ("drafts/*",))
+    assert not matches("blog/drafts.md", ("drafts/*",))
+    assert matches("blog/drafts", ("drafts",))
+
+
+def test_page_dest_path_only_replaces_the_extension():
+    assert page_dest_path("notes.md.d/index.md", "docs") == os.path.join(
+        "docs", "notes.md.d", "index.html"
+    )
+
+
+def test_scan_tree_skips_excluded_files_and_directories(tmp_path):
+    for path in ("a.md", "b/c.md", "b/.c.md.swp", "b/c.md~", "drafts/d.md", "e.png"):
+        write_file(str(tmp_path / path), "x")
+    files = scan_tree(str(tmp_path), ("*.md",), ("*.swp", "*~", "drafts"))
+    assert [relative_path for _, relative_path, _ in files] == ["a.md", "b/c.md"]
+    path, _, stat = files[1]
+    assert stat.st_size == os.stat(path).st_size
+
+
+def test_scan_site_lists_pages_and_assets_in_one_pass(tmp_path):
+    write_file(str(tmp_path / "content" / "index.md"), "# Home")
+    write_file(str(tmp_path / "content" / "blog" / "image.png"), "png")
+    write_file(str(tmp_path / "static" / "css" / "index.css"), "body {}")
+    write_file(str(tmp_path / "static" / "css" / ".index.css.swp"), "swap")
+    docs = str(tmp_path / "docs")
+    site_scan = scan_site(str(tmp_path / "content"), str(tmp_path / "static"), docs)
+    assert site_scan.pages == [
+        (str(tmp_path / "content" / "index.md"), os.path.join(docs, "index.html"))
+    ]
+    assert site_scan.assets == [
+        (
+            str(tmp_path / "static" / "css" / "index.css"),
+            os.path.join(docs, "css", "index.css"),
+        )
+    ]
+    assert set(site_scan.stats) == {
+        str(tmp_path / "content" / "index.md"),
+        str(tmp_path / "static" / "css" / "index.css"),
+    }
+
+
+def test_list_directory_memo_follows_directory_mtime(tmp_path):
+    write_file(str(tmp_path / "b.md"), "b")
+    (tmp_path / "a").mkdir()
+    set_listing_cache(True)
+    try:
+        entries = list_directory(str(tmp_path))
+        assert [(name, is_dir) for name, is_dir, _ in entries] == [
+            ("a", True),
+            ("b.md", False),
+        ]
+        write_file(str(tmp_path / "b.md"), "bbb")
+        write_file(str(tmp_path / "c.md"), "c")
+        os.utime(tmp_path, ns=(0, 0))
+        entries = list_directory(str(tmp_path))
+        assert [name for name, _, _ in entries] == ["a", "b.md", "c.md"]
+        assert entries[1][2].st_size == 3
+    finally:
+        set_listing_cache(False)
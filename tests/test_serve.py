@@ -0,0 +1,112 @@
+import os
+
+from static_site_gen.dependencies import DependencyGraph
+from static_site_gen.file_handler import generate_pages_incremental
+from static_site_gen.manifest import load_manifest
+from static_site_gen.serve import (
+    LIVE_RELOAD_SCRIPT,
+    DevServer,
+    changed_paths,
+    inject_live_reload,
+    snapshot,
+)
+from tests.helpers import make_site, read_file, write_file
+
+
+def make_server(tmp_path):
+    content, template, docs = make_site(
+        str(tmp_path),
+        {"index.md": "# Home\n\nWelcome", "blog/index.md": "# Blog\n\nPosts"},
+    )
+    write_file(str(tmp_path / "static" / "index.css"), "body {}")
+    server = DevServer(
+        content,
+        str(tmp_path / "static"),
+        template,
+        docs,
+        "/",
+        str(tmp_path / "manifest.json"),
+        str(tmp_path / "static-manifest.json"),
+    )
+    server.build()
+    return server
+
+
+def test_inject_live_reload():
+    html = inject_live_reload("<body><p>hi</p></body>")
+    assert html == f"<body><p>hi</p>{LIVE_RELOAD_SCRIPT}</body>"
+
+
+def test_changed_paths(tmp_path):
+    path = str(tmp_path / "a.md")
+    write_file(path, "one")
+    before = snapshot([str(tmp_path)])
+    write_file(path, "one and two")
+    write_file(str(tmp_path / "b.md"), "new")
+    after = snapshot([str(tmp_path)])
+    assert changed_paths(before, after) == {path, str(tmp_path / "b.md")}
+
+
+def test_rebuild_only_changed_page(tmp_path):
+    server = make_server(tmp_path)
+    blog_html = str(tmp_path / "docs" / "blog" / "index.html")
+    blog_mtime = os.stat(blog_html).st_mtime_ns
+
+    index_md = str(tmp_path / "content" / "index.md")
+    write_file(index_md, "# Home\n\nChanged")
+    server.rebuild({index_md})
+    assert "Changed" in read_file(str(tmp_path / "docs" / "index.html"))
+    assert os.stat(blog_html).st_mtime_ns == blog_mtime
+
+
+def test_rebuild_page_updates_the_dependency_graph(tmp_path):
+    server = make_server(tmp_path)
+    logo = str(tmp_path / "static" / "logo.png")
+    write_file(logo, "png")
+    index_md = str(tmp_path / "content" / "index.md")
+    write_file(index_md, "# Home\n\n![logo](/logo.png)")
+    server.rebuild({index_md})
+    index_html = os.path.join(server.dest_dir, "index.html")
+    graph = DependencyGraph(load_manifest(server.manifest_path))
+    assert graph.explain(index_html) == [
+        f"{index_md} changed",
+        f"{logo} is a new input",
+    ]
+    assert graph.dependents({logo}) == {index_html}
+    # The next incremental build finds the page up to date
+    rendered = generate_pages_incremental(
+        server.content_dir,
+        server.template_path,
+        server.dest_dir,
+        "/",
+        server.manifest_path,
+        static_dir_path=server.static_dir,
+    )
+    assert rendered == []
+
+    blog_md = str(tmp_path / "content" / "blog" / "index.md")
+    os.remove(blog_md)
+    server.rebuild({blog_md})
+    blog_html = os.path.join(server.dest_dir, "blog", "index.html")
+    assert blog_html not in load_manifest(server.manifest_path)
+
+
+def test_rebuild_removed_page_and_static_file(tmp_path):
+    server = make_server(tmp_path)
+    blog_md = str(tmp_path / "content" / "blog" / "index.md")
+    css = str(tmp_path / "static" / "index.css")
+    os.remove(blog_md)
+    write_file(css, "body { color: red; }")
+    server.rebuild({blog_md, css})
+    assert not os.path.exists(str(tmp_path / "docs" / "blog"))
+    assert read_file(str(tmp_path / "docs" / "index.css")) == "body { color: red; }"
+
+
+def test_rebuild_template_change(tmp_path):
+    server = make_server(tmp_path)
+    template = str(tmp_path / "template.html")
+    write_file(template, "<h1>{{ Title }}</h1>{{ Content }}")
+    server.rebuild({template})
+    assert read_file(str(tmp_path / "docs" / "blog" / "index.html")).startswith(
+        "<h1>Blog</h1>"
+    )
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from static_site_gen.file_handler import collect_page_jobs, generate_pages_recursive
+from static_site_gen.main import parse_args, run
+from static_site_gen.sharding import (
+    build_shard,
+    merge_shards,
+    parse_shard,
+    select_shard,
+    shard_argv,
+    shard_of,
+)
+from tests.helpers import make_site, read_file, write_file
+
+
+def make_blog(tmp_path, posts=6):
+    pages = {"index.md": "# Home\n\nWelcome"}
+    for idx in range(posts):
+        pages[f"blog/post{idx}.md"] = f"# Post {idx}\n\nText"
+    return make_site(str(tmp_path), pages)
+
+
+def test_parse_shard():
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for text in ("4/4", "-1/4", "1", "a/b", "0/0"):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shards_split_every_page_exactly_once(tmp_path):
+    content, _, _ = make_blog(tmp_path, posts=20)
+    page_jobs = collect_page_jobs(content, str(tmp_path / "docs"))
+    shards = [select_shard(page_jobs, content, index, 3) for index in range(3)]
+    assert sorted(job for shard in shards for job in shard) == sorted(page_jobs)
+    assert all(shards)
+    # The hash is of the relative path, so it is the same on every machine
+    assert shard_of("blog/post0.md", 3) == shard_of("blog/post0.md", 3)
+    assert [shard_of(f"p{idx}.md", 1) for idx in range(5)] == [0] * 5
+
+
+def test_merged_shards_match_a_single_build(tmp_path):
+    content, template, _ = make_blog(tmp_path)
+    shard_dir = str(tmp_path / "shards")
+    for index in range(3):
+        build_shard(content, template, shard_dir, "/", index, 3)
+    merged = str(tmp_path / "merged")
+    page_jobs = collect_page_jobs(content, merged)
+    summaries = merge_shards(shard_dir, 3, "/", page_jobs, merged)
+    assert set(summaries) == {dest_path for _, dest_path in page_jobs}
+    assert summaries[os.path.join(merged, "index.html")]["title"] == "Home"
+
+    single = str(tmp_path / "single")
+    generate_pages_recursive(content, template, single, "/")
+    for _, dest_path in page_jobs:
+        relative_path = os.path.relpath(dest_path, merged)
+        assert read_file(dest_path) == read_file(os.path.join(single, relative_path))
+
+
+def test_merge_refuses_missing_shards_and_pages(tmp_path):
+    content, template, _ = make_blog(tmp_path)
+    shard_dir = str(tmp_path / "shards")
+    build_shard(content, template, shard_dir, "/", 0, 2)
+    merged = str(tmp_path / "merged")
+    page_jobs = collect_page_jobs(content, merged)
+    with pytest.raises(Exception, match="Shard 1/2 has not finished"):
+        merge_shards(shard_dir, 2, "/", page_jobs, merged)
+
+    build_shard(content, template, shard_dir, "/", 1, 2)
+    with pytest.raises(Exception, match="basepath"):
+        merge_shards(shard_dir, 2, "/site/", page_jobs, merged)
+    write_file(os.path.join(content, "new.md"), "# New")
+    page_jobs = collect_page_jobs(content, merged)
+    with pytest.raises(Exception, match="1 page"):
+        merge_shards(shard_dir, 2, "/", page_jobs, merged)
+
+
+def test_shard_argv_drops_local_options():
+    argv = ["--local-shards", "3", "-q", "--trace=t.json", "/site/"]
+    assert shard_argv(argv, 1, 3) == ["-q", "/site/", "--shard", "1/3"]
+
+
+def test_local_shards_build_the_site_in_subprocesses(tmp_path, monkeypatch):
+    make_blog(tmp_path)
+    os.makedirs(tmp_path / "static")
+    monkeypatch.chdir(tmp_path)
+    args = parse_args(["--local-shards", "2", "-q", "--site-url", "https://x.org"])
+    assert run(args) == 0
+    assert "<h1>Post 3</h1>" in read_file("docs/blog/post3.html")
+    assert "https://x.org/blog/post3.html" in read_file("docs/sitemap.xml")
+    assert os.path.exists(".ssg-shards/1-of-2/manifest.json")
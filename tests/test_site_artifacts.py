@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+from static_site_gen.file_handler import (
+    generate_pages_incremental,
+    generate_pages_recursive,
+)
+from static_site_gen.profiling import Profiler
+from static_site_gen.render_cache import RenderCache
+from static_site_gen.site_artifacts import (
+    SiteArtifacts,
+    page_summary,
+    parse_date,
+    search_terms,
+)
+from tests.helpers import make_site, write_file
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+PAGES = {
+    "index.md": "# Home\n\nWelcome, hobbits!",
+    "blog/ring/index.md": (
+        "---\ndate: 2024-05-01\n---\n# The Ring\n\n- one **ring**\n- ![elven](/a.png)"
+    ),
+}
+
+
+def test_search_terms():
+    assert search_terms(["One Ring, one", "a ring-bearer 3 42"]) == [
+        "42",
+        "bearer",
+        "one",
+        "ring",
+    ]
+
+
+def test_page_summary_and_dates():
+    summary = page_summary("Title", {"date": "2024-05-01"}, ["Text"])
+    assert summary == {"title": "Title", "date": "2024-05-01", "terms": ["text"]}
+    assert parse_date("2024-05-01T10:00").isoformat() == "2024-05-01T00:00:00+00:00"
+    assert parse_date("someday") is None
+    assert parse_date(None) is None
+
+
+def test_site_artifacts_write(tmp_path):
+    artifacts = SiteArtifacts("https://example.com/", "Fan & Club", prefix_length=1)
+    artifacts.add("/", {"title": "Home", "date": None, "terms": ["hobbit", "home"]})
+    artifacts.add("/old/", {"title": "Old", "date": "2023-01-01", "terms": ["hobbit"]})
+    artifacts.add("/new/", {"title": "New", "date": "2024-01-01", "terms": ["ring"]})
+    docs = str(tmp_path)
+    write_file(os.path.join(docs, "search", "shards", "z.json"), "{}")
+    artifacts.write(docs, "/site/")
+
+    with open(os.path.join(docs, "sitemap.xml")) as sitemap:
+        assert (
+            "<url><loc>https://example.com/site/new/</loc>"
+            "<lastmod>2024-01-01</lastmod></url>" in sitemap.read()
+        )
+    with open(os.path.join(docs, "feed.xml")) as feed:
+        feed = feed.read()
+    assert "<title>Fan &amp; Club</title>" in feed
+    assert feed.index("/site/new/") < feed.index("/site/old/")
+    assert "<pubDate>Mon, 01 Jan 2024 00:00:00 +0000</pubDate>" in feed
+    assert "<title>Home</title>" not in feed
+
+    index = read_json(os.path.join(docs, "search", "index.json"))
+    assert index["pages"] == [
+        ["/site/", "Home"],
+        ["/site/new/", "New"],
+        ["/site/old/", "Old"],
+    ]
+    assert index["shards"] == ["h", "r"]
+    shards = os.path.join(docs, "search", "shards")
+    assert read_json(os.path.join(shards, "h.json")) == {"hobbit": [0, 2], "home": [0]}
+    assert read_json(os.path.join(shards, "r.json")) == {"ring": [1]}
+    assert not os.path.exists(os.path.join(shards, "z.json"))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"profiler": Profiler()},
+        {"io_concurrency": 2},
+        {"workers": 2},
+    ],
+    ids=["streaming", "staged", "async", "pool"],
+)
+def test_artifacts_come_from_the_render(tmp_path, options):
+    content, template, docs = make_site(str(tmp_path), PAGES)
+    artifacts = SiteArtifacts("https://example.com")
+    generate_pages_recursive(
+        content, template, docs, "/", artifacts=artifacts, **options
+    )
+    assert artifacts.pages == {
+        "/": {"title": "Home", "date": None, "terms": ["hobbits", "home", "welcome"]},
+        "/blog/ring/": {
+            "title": "The Ring",
+            "date": "2024-05-01",
+            "terms": ["elven", "one", "ring", "the"],
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"io_concurrency": 2}, {"workers": 2}],
+    ids=["staged", "async", "pool"],
+)
+def test_artifacts_from_render_cache_hits(tmp_path, options):
+    content, template, docs = make_site(str(tmp_path), PAGES)
+    write_file(os.path.join(content, "back.md"), "# Back\n\n[< Back Home](/)")
+    cache = RenderCache(str(tmp_path / "cache"))
+    rendered = SiteArtifacts("https://example.com")
+    generate_pages_recursive(
+        content, template, docs, "/", cache=cache, artifacts=rendered, **options
+    )
+    cached = SiteArtifacts("https://example.com")
+    generate_pages_recursive(
+        content, template, docs, "/", cache=cache, artifacts=cached, **options
+    )
+    # Image alt texts and link texts that look like tags survive the cache
+    assert cached.pages == rendered.pages
+    assert cached.pages["/blog/ring/"]["terms"] == ["elven", "one", "ring", "the"]
+    assert cached.pages["/back.html"]["terms"] == ["back", "home"]
+
+
+def test_incremental_artifacts_cover_unchanged_pages(tmp_path):
+    content, template, docs = make_site(str(tmp_path), PAGES)
+    manifest = str(tmp_path / "manifest.json")
+    generate_pages_incremental(content, template, docs, "/", manifest)
+
+    # Pages rendered without summaries are rendered once more to get them
+    artifacts = SiteArtifacts("https://example.com")
+    rendered = generate_pages_incremental(
+        content, template, docs, "/", manifest, artifacts=artifacts
+    )
+    assert len(rendered) == 2
+
+    write_file(os.path.join(content, "index.md"), "# Home\n\nChanged")
+    artifacts = SiteArtifacts("https://example.com")
+    rendered = generate_pages_incremental(
+        content, template, docs, "/", manifest, artifacts=artifacts
+    )
+    assert rendered == [os.path.join(docs, "index.html")]
+    assert sorted(artifacts.pages) == ["/", "/blog/ring/"]
+    assert artifacts.pages["/"]["terms"] == ["changed", "home"]
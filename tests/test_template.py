@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from static_site_gen.template import (
+    Template,
+    load_template,
+    rewrite_root_urls,
+    set_template_cache,
+)
+
+
+def test_template_render():
+    template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+    html = template.render(Title="Hello", Content="<p>world</p>")
+    assert html == "<title>Hello</title><main><p>world</p></main>"
+
+
+def test_template_rewrites_basepath_once():
+    template = Template(
+        '<link href="/index.css" /><main>{{ Content }}</main>', "/site/"
+    )
+    assert template.segments[0] == '<link href="/site/index.css" /><main>'
+    html = template.render(Content='<a href="/blog">blog</a>')
+    # Content is rewritten while it is emitted, not by the template
+    assert (
+        html == '<link href="/site/index.css" /><main><a href="/blog">blog</a></main>'
+    )
+
+
+def test_template_missing_slot_value():
+    template = Template("<title>{{ Title }}</title>{{ Author }}")
+    assert template.render(Title="Home") == "<title>Home</title>{{ Author }}"
+
+
+def test_rewrite_root_urls_default_basepath():
+    html = '<img src="/a.png" /><a href="/b">b</a>'
+    assert rewrite_root_urls(html, "/") == html
+    assert (
+        rewrite_root_urls(html, "/site/")
+        == '<img src="/site/a.png" /><a href="/site/b">b</a>'
+    )
+
+
+def test_template_iter_chunks_streams_iterables():
+    template = Template("<main>{{ Content }}</main>")
+    chunks = list(template.iter_chunks(Content=iter(["<p>", "a", "</p>"])))
+    assert chunks == ["<main>", "<p>", "a", "</p>", "</main>"]
+
+
+def test_load_template_inlines_partials(tmp_path):
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "template.html").write_text(
+        "{{> partials/head.html }}<main>{{ Content }}</main>{{> partials/head.html }}"
+    )
+    (tmp_path / "partials" / "head.html").write_text(
+        "<title>{{ Title }}</title>{{> nav.html }}"
+    )
+    (tmp_path / "partials" / "nav.html").write_text('<a href="/">home</a>')
+    template = load_template(str(tmp_path / "template.html"), "/site/")
+    assert template.render(Title="T", Content="C") == (
+        '<title>T</title><a href="/site/">home</a><main>C</main>'
+        '<title>T</title><a href="/site/">home</a>'
+    )
+    assert template.dependencies == [
+        str(tmp_path / "template.html"),
+        str(tmp_path / "partials" / "head.html"),
+        str(tmp_path / "partials" / "nav.html"),
+    ]
+
+
+def test_load_template_partial_cycle(tmp_path):
+    (tmp_path / "a.html").write_text("{{> b.html }}")
+    (tmp_path / "b.html").write_text("{{> a.html }}")
+    with pytest.raises(ValueError, match="include each other"):
+        load_template(str(tmp_path / "a.html"))
+
+
+def test_template_cache_reloads_changed_partials(tmp_path):
+    (tmp_path / "template.html").write_text("{{> nav.html }}{{ Content }}")
+    (tmp_path / "nav.html").write_text("<nav>a</nav>")
+    set_template_cache(True)
+    try:
+        template = load_template(str(tmp_path / "template.html"))
+        assert load_template(str(tmp_path / "template.html")) is template
+        assert load_template(str(tmp_path / "template.html"), "/site/") is not template
+        (tmp_path / "nav.html").write_text("<nav>b</nav>")
+        os.utime(tmp_path / "nav.html", ns=(0, 0))
+        reloaded = load_template(str(tmp_path / "template.html"))
+        assert reloaded.render(Content="C") == "<nav>b</nav>C"
+    finally:
+        set_template_cache(False)
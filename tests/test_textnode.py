@@ -72,3 +72,17 @@ def test_textnode_to_leafnode_unsupported_type():
     node = TextNode("This is a text", "gibberish", "google.com")
     with pytest.raises(ValueError, match="Unsupported textnode type."):
         text_node_to_html_node(node)
+
+
+def test_textnode_to_leafnode_shares_link_props():
+    first = text_node_to_html_node(TextNode("a", TextType.MD_LINK, "/blog"))
+    second = text_node_to_html_node(TextNode("b", TextType.MD_LINK, "/blog"))
+    assert first.props is second.props
+    with pytest.raises(TypeError):
+        first.props["href"] = "/elsewhere"
+
+
+def test_textnode_has_no_instance_dict():
+    node = TextNode("This is a test node", TextType.MD_BOLD)
+    with pytest.raises(AttributeError):
+        node.extra = "value"